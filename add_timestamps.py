@@ -43,6 +43,8 @@ MERCHANT_TIMES = {
     'New Years Party Supply': [(15, 0)],
 }
 
+DEFAULT_TIMES = [(10, 0), (12, 0), (14, 0), (16, 0), (19, 0)]
+
 def get_time_for_merchant(merchant):
     """Get a realistic time for a merchant"""
     for key, times in MERCHANT_TIMES.items():
@@ -57,29 +59,33 @@ def get_time_for_merchant(merchant):
                 hour = min(23, hour + 1)
             return f"{hour:02d}:{minute:02d}:00"
 
-    default_times = [(10, 0), (12, 0), (14, 0), (16, 0), (19, 0)]
-    hour, minute = random.choice(default_times)
+    hour, minute = random.choice(DEFAULT_TIMES)
     return f"{hour:02d}:{minute:02d}:00"
 
-with open('large_transactions.csv', 'r') as infile:
-    reader = csv.DictReader(infile)
-    rows = list(reader)
+def main():
+    with open('large_transactions.csv', 'r') as infile:
+        reader = csv.DictReader(infile)
+        rows = list(reader)
+
+    # Add timestamps
+    updated_rows = []
+    for row in rows:
+        merchant = row['merchant']
+        date_str = row['date']  # e.g., "2024-07-01"
+        time_str = get_time_for_merchant(merchant)
+
+        datetime_str = f"{date_str} {time_str}"
+        row['date'] = datetime_str
+        updated_rows.append(row)
 
-# Add timestamps
-updated_rows = []
-for row in rows:
-    merchant = row['merchant']
-    date_str = row['date']  # e.g., "2024-07-01"
-    time_str = get_time_for_merchant(merchant)
+    with open('large_transactions.csv', 'w', newline='') as outfile:
+        fieldnames = ['date', 'merchant', 'amount', 'description', 'category']
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(updated_rows)
 
-    datetime_str = f"{date_str} {time_str}"
-    row['date'] = datetime_str
-    updated_rows.append(row)
+    print(f"Updated {len(updated_rows)} transactions with timestamps!")
 
-with open('large_transactions.csv', 'w', newline='') as outfile:
-    fieldnames = ['date', 'merchant', 'amount', 'description', 'category']
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(updated_rows)
 
-print(f"Updated {len(updated_rows)} transactions with timestamps!")
+if __name__ == "__main__":
+    main()
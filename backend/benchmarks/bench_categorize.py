@@ -0,0 +1,86 @@
+"""
+Ingest-time category fill: time and accuracy on generated data.
+
+    cd backend
+    python benchmarks/bench_categorize.py --rows 1000000
+
+Generates a history with known categories, resolves its merchants into an
+empty temporary database and runs categorize.categorize on it with
+categories removed three ways: the whole file has no category column (rules
+only), 30% of rows lost theirs (the other rows of the same merchants are
+remembered), and 30% of merchants lost all of theirs (rules, then the model
+trained on the rest). Reports time, the
+share of rows filled and how many filled rows match the generator's category.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+# An empty scratch database, set before database.py reads it
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'categorize.db')}"
+
+import numpy as np
+import pandas as pd
+from categorize import categorize
+from database import SessionLocal, migrate
+from merchants import resolve_merchants
+
+
+def prepared(rows, seed, db):
+    """A generated history shaped like a prepared upload, merchants resolved"""
+    from generate_transactions import generate
+
+    df = generate(rows, seed=seed)
+    frame = pd.DataFrame({
+        "timestamp": (pd.to_datetime(df["date"]) - pd.Timestamp(0)) // pd.Timedelta(seconds=1),
+        "merchant": df["merchant"].astype(str),
+        "amount": df["amount"].astype(float),
+        "category": df["category"].astype(object),
+    })
+    frame["merchant_id"], names = resolve_merchants(db, frame["merchant"])
+    return frame.assign(merchant=names)
+
+
+def scenarios(frame, rng):
+    merchants = frame["merchant_id"].unique()
+    held_out = rng.choice(merchants, int(len(merchants) * 0.3), replace=False)
+    return {
+        "no category column": np.ones(len(frame), dtype=bool),
+        "30% of rows missing": rng.random(len(frame)) < 0.3,
+        "30% of merchants missing": frame["merchant_id"].isin(held_out).to_numpy(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    migrate()
+    db = SessionLocal()
+    try:
+        frame = prepared(args.rows, args.seed, db)
+        truth = frame["category"]
+        print(f"{args.rows:,} rows, {frame['merchant_id'].nunique():,} merchants, "
+              f"{truth.nunique()} categories")
+        for name, missing in scenarios(frame, np.random.default_rng(args.seed)).items():
+            batch = frame.assign(category=truth.where(~missing, None))
+            started = time.perf_counter()
+            filled = categorize(db, batch)
+            elapsed = time.perf_counter() - started
+            filled, expected = filled[missing], truth[missing]
+            placed = filled.notna()
+            print(f"  {name:<26} {elapsed:6.2f}s  {missing.sum():>9,} rows missing  "
+                  f"{placed.mean():6.1%} filled  {(filled[placed] == expected[placed]).mean():6.1%} of them correct")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
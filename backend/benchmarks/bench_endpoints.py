@@ -0,0 +1,193 @@
+"""
+End-to-end API benchmark over synthetic datasets of increasing size.
+
+    cd backend
+    python benchmarks/bench_endpoints.py --sizes 10000 100000 1000000
+    python benchmarks/bench_endpoints.py --sizes 10000 --compare benchmarks/results/<commit>.json
+
+For each size the generator in generate_transactions.py produces a seeded
+history, which is uploaded through the job queue. Each analytics endpoint is
+then timed cold (derived-result cache cleared) and warm. OpenAI calls are
+replaced with a canned local response so only our own work is measured.
+Results are written to benchmarks/results/<commit>.json.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, REPO_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_endpoints_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+ENDPOINTS = {
+    "summary": "/api/transactions/summary",
+    "subscriptions": "/api/subscriptions",
+    "fraud-detections": "/api/fraud-detections",
+    "forecast": "/api/forecast/monthly",
+    "trends": "/api/general-feedback-trends",
+    "dashboard": "/api/dashboard",
+}
+
+CANNED_BUDGET = {"budget_plan": [
+    {"category": "Overall", "trend": "stable", "recommendation": "Keep it up.", "budget_amount": 2500}
+] * 5}
+CANNED_FEEDBACK = {"feedback": [
+    {"type": "positive", "title": "Steady income", "message": "Nice work."}
+] * 5}
+
+
+def stub_openai():
+    """
+    Swap the OpenAI client for one that answers instantly with a valid payload
+    """
+    import openai
+    from types import SimpleNamespace
+
+    class Completions:
+        def create(self, messages, **kwargs):
+            payload = CANNED_BUDGET if "budget_plan" in messages[0]["content"] else CANNED_FEEDBACK
+            message = SimpleNamespace(content=json.dumps(payload))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    class FakeOpenAI:
+        def __init__(self, *args, **kwargs):
+            self.chat = SimpleNamespace(completions=Completions())
+
+    openai.OpenAI = FakeOpenAI
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def timed_get(client, path):
+    started = time.perf_counter()
+    response = client.get(path)
+    return time.perf_counter() - started, response.status_code
+
+
+def upload(client, contents):
+    """
+    Upload through the job queue; returns (ingest_s, total_s) where total
+    includes the post-ingest recomputation
+    """
+    started = time.perf_counter()
+    response = client.post(
+        "/api/transactions/upload",
+        files={"file": ("bench.parquet", contents, "application/octet-stream")}
+    )
+    job_id = response.json()["job_id"]
+    ingested = None
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if ingested is None and job["stage"] in ("recomputing", "done"):
+            ingested = time.perf_counter() - started
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.01)
+    if job["status"] == "failed":
+        raise RuntimeError(f"upload failed: {job['error']}")
+    return ingested, time.perf_counter() - started
+
+
+def bench_size(client, rows, seed):
+    import cache
+    from generate_transactions import generate
+
+    started = time.perf_counter()
+    df = generate(rows, seed=seed)
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    generate_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    client.delete("/api/transactions/all")
+    delete_s = time.perf_counter() - started
+
+    ingest_s, upload_s = upload(client, buffer.getvalue())
+    result = {
+        "rows": rows,
+        "generate_s": round(generate_s, 4),
+        "delete_previous_s": round(delete_s, 4),
+        "upload_ingest_s": round(ingest_s, 4),
+        "upload_total_s": round(upload_s, 4),
+        "endpoints": {},
+    }
+    for name, path in ENDPOINTS.items():
+        cache.invalidate()
+        cold_s, status = timed_get(client, path)
+        warm_s, _ = timed_get(client, path)
+        result["endpoints"][name] = {"status": status, "cold_s": round(cold_s, 4), "warm_s": round(warm_s, 4)}
+    return result
+
+
+def print_result(result, baseline=None):
+    print(f"\n{result['rows']:,} rows: upload {result['upload_ingest_s']:.3f}s ingest, "
+          f"{result['upload_total_s']:.3f}s with recompute")
+    base = (baseline or {}).get("endpoints", {})
+    for name, timing in result["endpoints"].items():
+        line = f"  {name:<18} cold {timing['cold_s']:8.3f}s  warm {timing['warm_s']:8.3f}s  [{timing['status']}]"
+        if name in base and base[name]["cold_s"]:
+            line += f"  cold x{timing['cold_s'] / base[name]['cold_s']:.2f} vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    stub_openai()
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["rows"]: r for r in json.load(f)["results"]}
+
+    commit = current_commit()
+    results = []
+    with TestClient(app_main.app) as client:
+        for rows in args.sizes:
+            result = bench_size(client, rows, args.seed)
+            results.append(result)
+            print_result(result, baseline.get(rows))
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare CSV, Parquet and Arrow IPC ingest on the same synthetic data.
+
+    cd backend
+    python benchmarks/bench_import.py --rows 100000 1000000
+
+Each format is parsed, validated and bulk inserted into a fresh SQLite file.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_import_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from database import SessionLocal, migrate
+from ingest import insert_transactions, prepare_transactions, read_transactions
+from maintenance import delete_transactions
+from merchants import resolve_merchants
+
+MERCHANTS = ["Starbucks", "Whole Foods", "Shell Gas Station", "Target", "Chipotle",
+             "Uber", "Amazon.com", "Netflix", "Rent Payment", "Paycheck Deposit"]
+CATEGORIES = ["Food & Dining", "Groceries", "Transportation", "Shopping", "Food & Dining",
+              "Transportation", "Shopping", "Entertainment", "Housing", "Income"]
+
+
+def synthetic_frame(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    merchant = rng.integers(0, len(MERCHANTS), rows)
+    seconds = np.sort(rng.integers(1_704_067_200, 1_735_689_600, rows))
+    return pd.DataFrame({
+        "date": pd.to_datetime(seconds, unit="s").strftime("%Y-%m-%d %H:%M:%S"),
+        "merchant": np.array(MERCHANTS)[merchant],
+        "amount": np.round(np.where(merchant == 9, 3200.0, -rng.gamma(2.0, 25.0, rows)), 2),
+        "description": None,
+        "category": np.array(CATEGORIES)[merchant],
+    })
+
+
+def encode(frame):
+    csv_bytes = frame.to_csv(index=False).encode("utf-8")
+    table = pa.Table.from_pandas(frame.assign(date=pd.to_datetime(frame["date"])), preserve_index=False)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    arrow = io.BytesIO()
+    with ipc.new_file(arrow, table.schema) as writer:
+        writer.write_table(table)
+    return {
+        "transactions.csv": csv_bytes,
+        "transactions.parquet": parquet.getvalue(),
+        "transactions.arrow": arrow.getvalue(),
+    }
+
+
+def run(filename, contents):
+    db = SessionLocal()
+    try:
+        delete_transactions(db)
+        started = time.perf_counter()
+        raw = read_transactions(filename, contents)
+        parsed = time.perf_counter()
+        frame, _ = prepare_transactions(raw)
+        frame["merchant_id"], _ = resolve_merchants(db, frame["merchant"])
+        prepared = time.perf_counter()
+        insert_transactions(db, frame)
+        db.commit()
+        inserted = time.perf_counter()
+    finally:
+        db.close()
+    return {
+        "read_s": round(parsed - started, 4),
+        "prepare_s": round(prepared - parsed, 4),
+        "insert_s": round(inserted - prepared, 4),
+        "total_s": round(inserted - started, 4),
+        "bytes": len(contents),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    migrate()
+    results = []
+    for rows in args.rows:
+        for filename, contents in encode(synthetic_frame(rows)).items():
+            result = {"rows": rows, "format": filename.rsplit(".", 1)[1], **run(filename, contents)}
+            results.append(result)
+            print(f"{rows:>10,} {result['format']:>8}  read {result['read_s']:8.3f}s  "
+                  f"prepare {result['prepare_s']:8.3f}s  insert {result['insert_s']:8.3f}s  "
+                  f"total {result['total_s']:8.3f}s  ({result['bytes'] / 1e6:.1f} MB)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
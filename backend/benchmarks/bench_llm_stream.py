@@ -0,0 +1,148 @@
+"""
+Time to first content of the streamed feedback endpoints against a fake LLM.
+
+    cd backend
+    python benchmarks/bench_llm_stream.py --rows 100000 --token-ms 15
+
+Starts a local server that speaks the OpenAI chat completions API (plain and
+streamed), emitting a canned answer a few characters at a time with a fixed
+delay per token, and points the client at it with OPENAI_BASE_URL. For
+/api/general-feedback and /api/general-feedback-trends, compares the blocking
+endpoint with its /stream variant: time to the first event, to each parsed
+item, and to the end, and checks the streamed items equal the blocking ones.
+"""
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_endpoints import CANNED_BUDGET, CANNED_FEEDBACK, upload
+
+TOKEN_CHARS = 4
+
+
+def canned_answer(messages):
+    payload = CANNED_BUDGET if "budget_plan" in messages[0]["content"] else CANNED_FEEDBACK
+    return json.dumps(payload, indent=2)
+
+
+def fake_openai(token_seconds):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            answer = canned_answer(request["messages"])
+            tokens = [answer[i:i + TOKEN_CHARS] for i in range(0, len(answer), TOKEN_CHARS)]
+            base = {"id": "fake", "created": int(time.time()), "model": request["model"]}
+
+            if not request.get("stream"):
+                time.sleep(token_seconds * len(tokens))
+                body = json.dumps({**base, "object": "chat.completion", "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": answer},
+                }]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokens + [None]:
+                time.sleep(token_seconds)
+                delta = {"content": token} if token is not None else {}
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "delta": delta, "finish_reason": None if token is not None else "stop",
+                }]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def read_events(response, started):
+    """Yield (seconds since started, event, data) as SSE events arrive"""
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield time.perf_counter() - started, event, json.loads(line[len("data: "):])
+
+
+def compare(client, name, path, item_event, item_key):
+    started = time.perf_counter()
+    blocking = client.get(path)
+    blocking_s = time.perf_counter() - started
+    assert blocking.status_code == 200, blocking.text
+
+    items, timeline = [], []
+    started = time.perf_counter()
+    with client.stream("GET", f"{path}/stream") as response:
+        assert response.status_code == 200, response.read()
+        for seconds, event, data in read_events(response, started):
+            timeline.append((event, seconds))
+            if event == item_event:
+                items.append(data)
+            elif event == "error":
+                raise RuntimeError(data["detail"])
+
+    first = timeline[0][1]
+    item_times = [seconds for event, seconds in timeline if event == item_event]
+    print(f"  {name}")
+    print(f"    blocking            {blocking_s:7.3f}s to the full response")
+    print(f"    stream first event  {first:7.3f}s ({timeline[0][0]})")
+    print(f"    stream items        {', '.join(f'{s:.2f}s' for s in item_times)}")
+    print(f"    stream done         {timeline[-1][1]:7.3f}s  "
+          f"items identical: {items == blocking.json()[item_key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = fake_openai(args.token_ms / 1000)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    import httpx
+    import uvicorn
+    import main as app_main
+    from generate_transactions import generate
+
+    buffer = io.BytesIO()
+    generate(args.rows, seed=args.seed).to_parquet(buffer, index=False)
+
+    # A real server rather than TestClient, so event arrival times are what a browser sees
+    api = uvicorn.Server(uvicorn.Config(app_main.app, host="127.0.0.1", port=0, log_level="warning"))
+    threading.Thread(target=api.run, daemon=True).start()
+    while not api.started:
+        time.sleep(0.05)
+    port = api.servers[0].sockets[0].getsockname()[1]
+
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+        client.delete("/api/transactions/all")
+        upload(client, buffer.getvalue())
+        print(f"{args.rows:,} rows, fake LLM at {args.token_ms:g} ms per {TOKEN_CHARS}-character token")
+        compare(client, "general feedback", "/api/general-feedback", "feedback", "feedback")
+        compare(client, "trends", "/api/general-feedback-trends", "budget_item", "budget_plan")
+
+    api.should_exit = True
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Merchant normalization throughput and collapse quality on noisy descriptors.
+
+    cd backend
+    python benchmarks/bench_merchants.py --rows 1000000 --brands 2000
+
+Generates --rows bank-statement descriptors for --brands merchants, each
+written the many ways card networks report it ("NETFLIX.COM 866-579-7172",
+"SQ *BLUE BOTTLE #12", "Netflix Inc", typos), and resolves them with
+merchants.resolve_merchants into an empty temporary database: a cold batch
+that creates every merchant, then a second batch of the same size where most
+descriptors are known aliases and the rest are new variants. Reports time,
+distinct descriptors, merchants created per true brand and how many merchants
+mix brands. Finally resolves brands told apart only by a short number
+("Studio 54", "Studio 12"), which must stay separate merchants.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# An empty scratch database, set before database.py reads it
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'merchants.db')}"
+
+import numpy as np
+import pandas as pd
+from database import SessionLocal, migrate
+from merchants import BLOCK_CHARS, reset, resolve_merchants
+
+SUFFIXES = ["Coffee", "Market", "Pizza", "Fitness", "Books", "Pharmacy", "Cafe", "Hardware", "Grill", "Cleaners"]
+PREFIXES = ["SQ *", "TST* ", "POS DEBIT ", "PAYPAL *", ""]
+CORPORATE = [" Inc", " LLC", " Co", ".com", ""]
+
+
+def brand_names(brands, rng):
+    names = set()
+    while len(names) < brands:
+        word = "".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), rng.integers(5, 9))).capitalize()
+        names.add(f"{word} {rng.choice(SUFFIXES)}" if rng.random() < 0.6 else word)
+    return sorted(names)
+
+
+def variant(name, rng):
+    """One way a statement might print the merchant"""
+    text = name
+    if rng.random() < 0.1:
+        # Dropped letter; typos inside the first BLOCK_CHARS letters are not caught by design
+        i = rng.integers(BLOCK_CHARS, len(text))
+        text = text[:i] + text[i + 1:]
+    text = rng.choice(PREFIXES) + text + rng.choice(CORPORATE)
+    if rng.random() < 0.5:
+        text += f" #{rng.integers(1, 9999)}"
+    if rng.random() < 0.2:
+        text += f" {rng.integers(200, 999)}-{rng.integers(200, 999)}-{rng.integers(1000, 9999)}"
+    return text.upper() if rng.random() < 0.5 else text
+
+
+def descriptors(rows, brands, variants, seed):
+    """(descriptor Series, true brand per row), Zipf-distributed over brands"""
+    rng = np.random.default_rng(seed)
+    names = brand_names(brands, rng)
+    table = [(variant(names[b], rng), b) for b in range(brands) for _ in range(variants)]
+    weights = 1.0 / np.arange(1, brands + 1) ** 1.1
+    brand = rng.choice(brands, rows, p=weights / weights.sum())
+    pick = brand * variants + rng.integers(0, variants, rows)
+    raw = np.array([text for text, _ in table], dtype=object)[pick]
+    return pd.Series(raw), brand
+
+
+def numbered_descriptors(rng, words=10, numbers=5, variants=5):
+    """(descriptor Series, true brand per row) for brands that differ only by a number"""
+    bases = [f"{name} {rng.choice(SUFFIXES)}" for name in brand_names(words, rng)]
+    names = [f"{base} {n}" for base in bases for n in rng.choice(np.arange(1, 100), numbers, replace=False)]
+    table = [(variant(name, rng), b) for b, name in enumerate(names) for _ in range(variants)]
+    return pd.Series([text for text, _ in table]), np.array([b for _, b in table])
+
+
+def quality(ids, brand):
+    pairs = pd.DataFrame({"merchant": ids, "brand": brand}).drop_duplicates()
+    per_brand = pairs.groupby("brand").size()
+    mixed = int((pairs.groupby("merchant").size() > 1).sum())
+    return len(pairs["merchant"].unique()), float(per_brand.mean()), int(per_brand.max()), mixed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--brands", type=int, default=2_000)
+    parser.add_argument("--variants", type=int, default=40, help="distinct descriptors per brand")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    migrate()
+    raw, brand = descriptors(args.rows, args.brands, args.variants, args.seed)
+    print(f"{args.rows:,} rows, {raw.nunique():,} distinct descriptors of {args.brands:,} brands")
+
+    halves = [slice(0, args.rows // 2), slice(args.rows // 2, args.rows)]
+    db = SessionLocal()
+    try:
+        for label, rows in zip(["cold batch", "warm batch"], halves):
+            started = time.perf_counter()
+            ids, _ = resolve_merchants(db, raw.iloc[rows])
+            db.commit()
+            elapsed = time.perf_counter() - started
+            merchants, per_brand, worst, mixed = quality(ids, brand[rows])
+            print(f"  {label}  {elapsed:7.3f}s  {raw.iloc[rows].nunique():>7,} descriptors -> {merchants:>6,} merchants  "
+                  f"{per_brand:.2f} per brand (max {worst})  {mixed} mixing brands")
+
+        raw, brand = numbered_descriptors(np.random.default_rng(args.seed + 1))
+        ids, _ = resolve_merchants(db, raw)
+        db.commit()
+        merchants, _, _, mixed = quality(ids, brand)
+        print(f"  numbered brands  {brand.max() + 1} brands differing only by a number -> {merchants} merchants  "
+              f"{mixed} mixing brands")
+
+        # Loading the lookup tables back from the database, as after a restart
+        reset()
+        started = time.perf_counter()
+        resolve_merchants(db, raw.iloc[:1])
+        print(f"  reload of the alias cache  {time.perf_counter() - started:.3f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Monte Carlo projection latency against path count.
+
+    cd backend
+    python benchmarks/bench_projection.py --paths 1000 10000 50000 100000 200000
+
+Builds the monthly per-category history of a synthetic dataset (the shape
+rollup.monthly_breakdown returns) and times ml.projection.projection for each
+path count and horizon, best of --repeat runs, including the percentile and
+probability reductions.
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+from ml.projection import projection
+
+
+def synthetic_history(rows, seed):
+    """monthly_data, subscription entries and their charge months for a generated history"""
+    import pandas as pd
+    from generate_transactions import SUBSCRIPTIONS, generate
+
+    df = generate(rows, seed=seed)
+    df["month"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m")
+    df["category"] = df["category"].fillna("Uncategorized")
+    expenses = df[df["amount"] < 0]
+    by_category = (-expenses.groupby(["month", "category"])["amount"].sum()).unstack(fill_value=0.0)
+    income = df[df["amount"] > 0].groupby("month")["amount"].sum()
+
+    monthly_data = {}
+    for month, row in by_category.iterrows():
+        categories = {category: amount for category, amount in row.items() if amount > 0}
+        monthly_data[month] = {
+            "income": float(income.get(month, 0.0)),
+            "expenses": sum(categories.values()),
+            "categories": categories,
+        }
+    charges = expenses[expenses["merchant"].isin(SUBSCRIPTIONS)]
+    charge_months = {}
+    for (merchant, month), n in charges.groupby(["merchant", "month"]).size().items():
+        charge_months.setdefault(merchant, {})[month] = int(n)
+    subscriptions = [
+        {"merchant": merchant, "category": category, "estimated_monthly_cost": amount,
+         "last_charged": str(charges.loc[charges["merchant"] == merchant, "date"].max())[:10]}
+        for merchant, (category, amount) in SUBSCRIPTIONS.items() if merchant in charge_months
+    ]
+    return monthly_data, subscriptions, charge_months
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, nargs="+", default=[1_000, 10_000, 50_000, 100_000, 200_000])
+    parser.add_argument("--horizons", type=int, nargs="+", default=[6, 24])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    monthly_data, subscriptions, charge_months = synthetic_history(args.rows, args.seed)
+    categories = {c for data in monthly_data.values() for c in data["categories"]}
+    print(f"{len(monthly_data)} months x {len(categories)} categories of history, "
+          f"{len(subscriptions)} fixed subscriptions, best of {args.repeat}")
+
+    for horizon in args.horizons:
+        for paths in args.paths:
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = projection(monthly_data, subscriptions, charge_months, horizon=horizon, paths=paths)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"  {horizon:>3} months {paths:>8,} paths  {best * 1000:8.1f} ms  "
+                  f"P(negative) {result['probability_negative']:.3f}  "
+                  f"median savings {result['savings_percentiles']['p50']:>12,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Response serialization benchmark on 100k-row payloads.
+
+    cd backend
+    python benchmarks/bench_serialization.py --rows 100000
+
+Compares the previous response paths (ORM objects validated against
+response_model; DataFrame.to_dict + jsonable_encoder) with the FastJSONResponse
+path (column rows / DataFrame columns encoded straight to bytes), end to end
+through the app, and checks both return the same JSON.
+"""
+import argparse
+import io
+import json
+import time
+from typing import List
+
+from bench_endpoints import stub_openai, upload
+
+
+def timed(client, path, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert response.status_code == 200, response.text
+    return best, response
+
+
+def add_legacy_routes(app, frame):
+    """The response paths as they were before FastJSONResponse"""
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+    from database import get_db
+    from models import Transaction
+    from schemas import TransactionResponse
+    from fastjson import FastJSONResponse, frame_records
+
+    @app.get("/bench/legacy/transactions", response_model=List[TransactionResponse])
+    def legacy_transactions(limit: int, db: Session = Depends(get_db)):
+        transactions = db.query(Transaction).order_by(Transaction.timestamp.desc()).limit(limit).all()
+        return [
+            TransactionResponse(
+                id=t.id, date=t.date, merchant=t.merchant, amount=t.amount,
+                description=t.description, category=t.category,
+                created_at=t.created_at.isoformat() if t.created_at else None
+            )
+            for t in transactions
+        ]
+
+    @app.get("/bench/legacy/frame")
+    def legacy_frame():
+        return frame.to_dict(orient="records")
+
+    @app.get("/bench/fast/frame")
+    def fast_frame():
+        return FastJSONResponse(frame_records(frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stub_openai()
+    import numpy as np
+    from fastapi.testclient import TestClient
+    import fastjson
+    import main as app_main
+    from database import SessionLocal
+    from generate_transactions import generate
+
+    buffer = io.BytesIO()
+    generate(args.rows, seed=args.seed).to_parquet(buffer, index=False)
+
+    with TestClient(app_main.app) as client:
+        client.delete("/api/transactions/all")
+        upload(client, buffer.getvalue())
+
+        db = SessionLocal()
+        try:
+            frame = app_main.load_ledger(db).frame
+        finally:
+            db.close()
+        # Shaped like the fraud-detections payload, at full size
+        frame = frame[["id", "merchant", "amount", "date", "category"]].assign(
+            anomaly_score=np.random.default_rng(args.seed).normal(-0.45, 0.05, len(frame))
+        )
+        add_legacy_routes(app_main.app, frame)
+
+        print(f"{len(frame):,}-row responses (best of {args.repeat}), encoder: "
+              f"{'orjson' if fastjson.orjson else 'json'}")
+        cases = [
+            ("transactions", f"/bench/legacy/transactions?limit={args.rows}",
+             f"/api/transactions?limit={args.rows}"),
+            ("dataframe records", "/bench/legacy/frame", "/bench/fast/frame"),
+        ]
+        for name, before_path, after_path in cases:
+            before_s, before = timed(client, before_path, args.repeat)
+            after_s, after = timed(client, after_path, args.repeat)
+            same = json.loads(before.content) == json.loads(after.content)
+            print(f"  {name:<18} before {before_s:7.3f}s  after {after_s:7.3f}s  "
+                  f"x{before_s / after_s:.1f}  identical={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Measure cold start: import-time breakdown of main.py and time to first healthy response.
+
+    cd backend
+    python benchmarks/bench_startup.py --runs 5 [--warmup] [--json startup.json]
+
+Each run spawns a fresh uvicorn process against a throwaway SQLite file and
+polls /api/health until it answers.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_env(work_dir, warmup=False):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{work_dir}/bench.db"
+    env["WARMUP"] = "1" if warmup else "0"
+    env["PYTHONPATH"] = BACKEND_DIR
+    return env
+
+
+def import_breakdown(work_dir, top=15):
+    """
+    Run `python -X importtime -c 'import main'` and sum self time per top-level package
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=work_dir, env=bench_env(work_dir), capture_output=True, text=True, check=True
+    )
+    per_package = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        per_package[name.split(".")[0]] += int(self_us)
+        if name == "main":
+            total_us = int(cumulative_us)
+
+    packages = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_s": round(total_us / 1e6, 4),
+        "packages_s": {name: round(us / 1e6, 4) for name, us in packages},
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(work_dir, warmup=False, timeout=60):
+    port = free_port()
+    # Bypass any configured HTTP proxy for the loopback health checks
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=work_dir, env=bench_env(work_dir, warmup),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with opener.open(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not become healthy")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="start with WARMUP=1")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    breakdown = import_breakdown(work_dir)
+    samples = [time_to_healthy(work_dir, args.warmup) for _ in range(args.runs)]
+    results = {
+        "import_main": breakdown,
+        "time_to_healthy_s": {
+            "min": round(min(samples), 4),
+            "median": round(statistics.median(samples), 4),
+            "max": round(max(samples), 4),
+        },
+        "warmup": args.warmup,
+    }
+
+    print(f"import main: {breakdown['total_s']:.3f}s")
+    for name, seconds in breakdown["packages_s"].items():
+        print(f"  {name:<24} {seconds:.3f}s")
+    print("time to first healthy response: median {median:.3f}s (min {min:.3f}s, max {max:.3f}s)"
+          .format(**results["time_to_healthy_s"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
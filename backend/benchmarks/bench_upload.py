@@ -0,0 +1,98 @@
+"""
+Multi-file upload benchmark: one request of N statements versus N uploads.
+
+    cd backend
+    python benchmarks/bench_upload.py --files 24 --rows 50000
+
+Splits a synthetic history into --files monthly CSV statements of --rows rows
+each and ingests them twice into an empty database: one upload job per file,
+waiting for each (the previous onboarding flow), then all files in a single
+request, parsed across UPLOAD_PARSE_PROCESSES worker processes. Reports time
+to ingested and time including the post-ingest recomputation, and checks both
+leave the same transactions.
+"""
+import argparse
+import os
+import time
+
+from bench_endpoints import stub_openai
+
+
+def upload(client, statements):
+    """(ingested_s, total_s) for one job holding all statements"""
+    started = time.perf_counter()
+    response = client.post(
+        "/api/transactions/upload",
+        files=[("files", (name, content, "text/csv")) for name, content in statements]
+    )
+    job = response.json()
+    ingested = None
+    while job["status"] not in ("completed", "failed"):
+        if ingested is None and job["stage"] in ("recomputing", "done"):
+            ingested = time.perf_counter() - started
+        time.sleep(0.02)
+        job = client.get(f"/api/jobs/{job['job_id']}").json()
+    if job["status"] == "failed":
+        raise RuntimeError(f"upload failed: {job['error']}")
+    return ingested or time.perf_counter() - started, time.perf_counter() - started
+
+
+def sequential(client, statements):
+    ingested = total = 0.0
+    for statement in statements:
+        ingested_s, total_s = upload(client, [statement])
+        ingested += ingested_s
+        total += total_s
+    return ingested, total
+
+
+def checksum(client):
+    from database import SessionLocal
+    from sqlalchemy import text
+    with SessionLocal() as db:
+        return tuple(db.execute(text(
+            "SELECT COUNT(*), ROUND(SUM(amount), 2), SUM(timestamp) FROM transactions"
+        )).one())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=24)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stub_openai()
+    import numpy as np
+    from fastapi.testclient import TestClient
+    import jobs
+    import main as app_main
+    from generate_transactions import generate
+
+    history = generate(args.files * args.rows, seed=args.seed, months=args.files)
+    bounds = np.linspace(0, len(history), args.files + 1).astype(int)
+    statements = [
+        (f"statement_{i + 1:02d}.csv", history.iloc[start:end].to_csv(index=False).encode())
+        for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ]
+    size = sum(len(content) for _, content in statements) / 1e6
+    print(f"{args.files} statements x {args.rows:,} rows ({size:.0f} MB CSV), "
+          f"{jobs.PARSE_PROCESSES} parse processes on {os.cpu_count()} CPUs")
+
+    with TestClient(app_main.app) as client:
+        client.delete("/api/transactions/all")
+        seq_ingest, seq_total = sequential(client, statements)
+        seq_sum = checksum(client)
+
+        client.delete("/api/transactions/all")
+        multi_ingest, multi_total = upload(client, statements)
+        multi_sum = checksum(client)
+
+    print(f"  sequential uploads  ingest {seq_ingest:8.2f}s  total {seq_total:8.2f}s")
+    print(f"  one multi-file job  ingest {multi_ingest:8.2f}s  total {multi_total:8.2f}s  "
+          f"x{seq_ingest / multi_ingest:.1f} ingest, x{seq_total / multi_total:.1f} total")
+    print(f"  same transactions: {seq_sum == multi_sum} ({multi_sum[0]:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
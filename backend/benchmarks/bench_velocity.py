@@ -0,0 +1,74 @@
+"""
+Velocity feature scaling benchmark.
+
+    cd backend
+    python benchmarks/bench_velocity.py --sizes 100000 1000000 4000000
+
+Times add_velocity_features (count and spend per merchant and overall over
+each VELOCITY_WINDOWS window) on synthetic time-sorted histories, reporting
+ns/row so linear scaling is visible, and checks sampled rows of the smallest
+size against a brute-force scan of each window.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from constants import VELOCITY_WINDOWS
+from ml.velocity import add_velocity_features
+
+
+def synthetic(rows, seed):
+    """Two years of spending, Zipf-distributed over 20k merchants, unique timestamps"""
+    rng = np.random.default_rng(seed)
+    start = 1672531200
+    timestamps = start + np.sort(rng.choice(2 * 365 * 86400, rows, replace=False))
+    merchants = np.minimum(rng.zipf(1.3, rows), 20_000)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "merchant_id": merchants,
+        "merchant": pd.Categorical(merchants).astype(str),
+        "amount": -np.round(rng.lognormal(3, 1, rows), 2),
+    })
+
+
+def check(df):
+    features = add_velocity_features(df.copy())
+    ts = df["timestamp"].to_numpy()
+    spend = df["amount"].abs().to_numpy()
+    merchants = df["merchant_id"].to_numpy()
+    rng = np.random.default_rng(0)
+    for i in rng.choice(len(df), 200, replace=False):
+        for name, seconds in VELOCITY_WINDOWS.items():
+            window = (ts > ts[i] - seconds) & (np.arange(len(df)) <= i)
+            same = window & (merchants == merchants[i])
+            expected = (window.sum(), spend[window].sum(), same.sum(), spend[same].sum())
+            actual = (features[f"count_{name}"].iat[i], features[f"spend_{name}"].iat[i],
+                      features[f"merchant_count_{name}"].iat[i], features[f"merchant_spend_{name}"].iat[i])
+            if not np.allclose(expected, actual):
+                raise AssertionError(f"row {i} window {name}: expected {expected}, got {actual}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    check(synthetic(min(args.sizes), args.seed))
+    print(f"Checked 200 rows against a brute-force window scan ({len(VELOCITY_WINDOWS)} windows)")
+
+    for rows in args.sizes:
+        df = synthetic(rows, args.seed)
+        started = time.perf_counter()
+        add_velocity_features(df)
+        elapsed = time.perf_counter() - started
+        print(f"  {rows:>10,} rows  {elapsed:7.3f}s  {elapsed / rows * 1e9:6.0f} ns/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import threading
+from sqlalchemy import text
+from database import SessionLocal
+
+# Derived analytics (forecast, subscriptions, fraud detections) keyed by name,
+# valid for the data version they were computed at. Every write to the
+# transactions table must call bump_version() in its own transaction.
+_results = {}
+_results_version = None
+_generation = 0
+_lock = threading.Lock()
+
+_VERSION = text("SELECT version FROM data_version WHERE id = 1")
+_BUMP = text(
+    "INSERT INTO data_version (id, version) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = version + 1"
+)
+
+
+def get_or_compute(key, compute):
+    """
+    Return the cached result for key, computing it on a miss. Results are
+    dropped once the stored data version moves on, whichever process wrote,
+    and a result is only stored if nothing invalidated it while it was being
+    computed.
+    """
+    global _results_version
+    version = data_version()
+    with _lock:
+        if version != _results_version:
+            _results.clear()
+            _results_version = version
+        if key in _results:
+            return _results[key]
+        generation = _generation
+
+    value = compute()
+
+    with _lock:
+        if generation == _generation and version == _results_version:
+            _results[key] = value
+    return value
+
+
+def data_version():
+    """
+    The stored data version. Read on every call (a one-row primary key
+    lookup) so that writes by other worker processes are seen immediately.
+    """
+    db = SessionLocal()
+    try:
+        return db.execute(_VERSION).scalar() or 0
+    finally:
+        db.close()
+
+
+def bump_version(db):
+    """Increase the data version inside the caller's write transaction; not committed here"""
+    db.execute(_BUMP)
+
+
+def invalidate():
+    """Drop this process's cached results"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _results.clear()
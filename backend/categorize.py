@@ -0,0 +1,130 @@
+import re
+from sqlalchemy import func
+from constants import CATEGORY_KEYWORDS, INCOME_CATEGORY
+from merchants import merchant_key
+from models import Merchant, Transaction
+
+# Model predictions less likely than this leave the category empty
+MIN_MODEL_PROBABILITY = 0.5
+
+_RULES = [
+    (category, re.compile(r"\b(?:" + "|".join(re.escape(merchant_key(k)) for k in keywords) + r")\b"))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+]
+
+
+def rule_category(key, incoming):
+    """
+    First CATEGORY_KEYWORDS category with a keyword in the merchant key, or
+    None; the INCOME_CATEGORY keywords count only if incoming is true
+    """
+    for category, pattern in _RULES:
+        if category == INCOME_CATEGORY and not incoming:
+            continue
+        if pattern.search(key):
+            return category
+    return None
+
+
+def _labelled_merchants(db, frame):
+    """
+    {merchant_id: (key, category)} for every merchant with categorized rows,
+    in the database or this batch, labelled with its most common category
+    """
+    import pandas as pd
+
+    history = db.query(Transaction.merchant_id, Merchant.key, Transaction.category, func.count())\
+        .join(Merchant, Transaction.merchant_id == Merchant.id)\
+        .filter(Transaction.category.isnot(None))\
+        .group_by(Transaction.merchant_id, Transaction.category)\
+        .all()
+    counts = pd.DataFrame.from_records(history, columns=["merchant_id", "key", "category", "n"])
+
+    labelled = frame[frame["category"].notna()]
+    if not labelled.empty:
+        batch = labelled.groupby(["merchant_id", "category"], sort=False).agg(
+            merchant=("merchant", "first"), n=("amount", "size")
+        ).reset_index()
+        batch["key"] = batch["merchant"].map(merchant_key)
+        counts = pd.concat([counts, batch[counts.columns]], ignore_index=True)
+    if counts.empty:
+        return {}
+
+    counts = counts.groupby(["merchant_id", "category"], sort=False).agg(key=("key", "first"), n=("n", "sum"))
+    top = counts.sort_values("n", ascending=False, kind="stable").reset_index().drop_duplicates("merchant_id")
+    return {int(m): (key, category) for m, key, category in zip(top["merchant_id"], top["key"], top["category"])}
+
+
+def _train(labelled):
+    """Character n-gram naive Bayes over merchant keys, or None with fewer than two categories"""
+    categories = [category for _, category in labelled.values()]
+    if len(set(categories)) < 2:
+        return None
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import ComplementNB
+    from sklearn.pipeline import make_pipeline
+
+    model = make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+        ComplementNB(alpha=0.3),
+    )
+    model.fit([key for key, _ in labelled.values()], categories)
+    return model
+
+
+def categorize(db, frame):
+    """
+    Categories for a prepared batch (merchant_id, merchant as the canonical
+    name, amount and category columns), with the missing ones filled in.
+    Each merchant is classified once, in order:
+
+    1. its most common category among already-categorized rows, stored or in
+       this batch;
+    2. CATEGORY_KEYWORDS rules on its normalized name (the INCOME_CATEGORY
+       ones only if all its amounts in the batch are incoming), then
+       INCOME_CATEGORY if they are;
+    3. a naive Bayes model trained on the names of the merchants in 1, when
+       it is at least MIN_MODEL_PROBABILITY sure.
+
+    Rows no step can place stay None (shown as Uncategorized).
+    Runs locally; returns a Series aligned with frame.
+    """
+    import pandas as pd
+
+    category = frame["category"]
+    missing = category.isna()
+    if not missing.any():
+        return category
+
+    pending = frame[missing].groupby("merchant_id", sort=False).agg(
+        merchant=("merchant", "first"), incoming=("amount", "min")
+    )
+    pending["incoming"] = pending["incoming"] > 0
+
+    labelled = _labelled_merchants(db, frame)
+    assigned, unresolved = {}, []
+    for merchant_id, merchant, incoming in zip(pending.index, pending["merchant"], pending["incoming"]):
+        known = labelled.get(int(merchant_id))
+        if known is not None:
+            assigned[merchant_id] = known[1]
+            continue
+        key = merchant_key(merchant)
+        rule = rule_category(key, incoming) or (INCOME_CATEGORY if incoming else None)
+        if rule is not None:
+            assigned[merchant_id] = rule
+        else:
+            unresolved.append((merchant_id, key))
+
+    model = _train(labelled) if unresolved else None
+    if model is not None:
+        probabilities = model.predict_proba([key for _, key in unresolved])
+        best = probabilities.argmax(axis=1)
+        for (merchant_id, _), column, p in zip(unresolved, best, probabilities.max(axis=1)):
+            if p >= MIN_MODEL_PROBABILITY:
+                assigned[merchant_id] = model.classes_[column]
+
+    filled = frame.loc[missing, "merchant_id"].map(assigned)
+    category = category.copy()
+    category[missing] = filled.astype(object).where(filled.notna(), None)
+    return category
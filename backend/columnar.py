@@ -0,0 +1,131 @@
+import io
+from sqlalchemy import select
+from models import Transaction
+
+EXPORT_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv",
+}
+BATCH_SIZE = 50000
+
+EXPORT_COLUMNS = [
+    Transaction.id, Transaction.timestamp, Transaction.merchant,
+    Transaction.amount, Transaction.description, Transaction.category,
+]
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow support requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def transaction_schema():
+    pa = require_pyarrow()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("s")),
+        ("merchant", pa.string()),
+        ("amount", pa.float64()),
+        ("description", pa.string()),
+        ("category", pa.string()),
+    ])
+
+
+def read_table(filename, contents):
+    """
+    Read a Parquet file or Arrow IPC file/stream into a DataFrame.
+    Numeric and timestamp columns are handed to pandas without copying.
+    """
+    pa = require_pyarrow()
+    source = pa.BufferReader(contents)
+    if filename.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        table = pq.read_table(source)
+    else:
+        import pyarrow.ipc as ipc
+        try:
+            table = ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            table = ipc.open_stream(pa.BufferReader(contents)).read_all()
+
+    return table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+
+
+def iter_record_batches(db, conditions=(), batch_size=BATCH_SIZE):
+    """
+    Yield transactions matching conditions as Arrow record batches, paging by id.
+    The epoch column becomes a timestamp column with a zero-copy cast.
+    """
+    pa = require_pyarrow()
+    schema = transaction_schema()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*EXPORT_COLUMNS)
+            .where(*conditions, Transaction.id > last_id)
+            .order_by(Transaction.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+
+        ids, timestamps, merchants, amounts, descriptions, categories = zip(*rows)
+        yield pa.RecordBatch.from_arrays([
+            pa.array(ids, type=pa.int64()),
+            pa.array(timestamps, type=pa.int64()).view(pa.timestamp("s")),
+            pa.array(merchants, type=pa.string()),
+            pa.array(amounts, type=pa.float64()),
+            pa.array(descriptions, type=pa.string()),
+            pa.array(categories, type=pa.string()),
+        ], schema=schema)
+        last_id = ids[-1]
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only file object that lets a streaming response drain what has been written so far"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def open_writer(fmt, sink, schema):
+    pa = require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema)
+    if fmt == "arrow":
+        import pyarrow.ipc as ipc
+        return ipc.new_stream(sink, schema)
+    import pyarrow.csv as pacsv
+    return pacsv.CSVWriter(sink, schema)
+
+
+def export_stream(db, fmt, conditions=()):
+    """
+    Generate the encoded table batch by batch, so memory stays bounded by BATCH_SIZE
+    """
+    pa = require_pyarrow()
+    sink = _Chunks()
+    writer = open_writer(fmt, pa.PythonFile(sink, mode="w"), transaction_schema())
+    for batch in iter_record_batches(db, conditions):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
@@ -12,7 +12,60 @@ COMMON_MERCHANTS = {
     "uber", "lyft", "doordash", "grubhub", "mcdonald", "subway", "kroger"
 }
 
+SUPPORTED_EXTENSIONS = ('.csv', '.parquet', '.arrow', '.arrows', '.feather', '.ipc')
+# Archives of supported files, expanded at ingest
+ARCHIVE_EXTENSIONS = ('.zip',)
+
 MONTHLY_FIXED_EXPENSES = {
     "rent", "electric", "water", "gas", "internet", "utilities", "mortgage",
     "hoa", "insurance", "loan payment"
-}
\ No newline at end of file
+}
+# Trailing windows (seconds) for the fraud velocity features
+VELOCITY_WINDOWS = {
+    "1h": 3600,
+    "24h": 86400,
+    "7d": 7 * 86400,
+}
+
+# Keyword rules for filling in missing categories at ingest (see categorize.py),
+# matched as whole words against the normalized merchant key; the first
+# category with a matching keyword wins. Income keywords only apply to merchants
+# whose amounts are all incoming. Keep keywords specific: a common word ("bar",
+# "power", "delta") also turns up in names from other categories.
+CATEGORY_KEYWORDS = {
+    "Income": [
+        "paycheck", "payroll", "salary", "direct dep", "direct deposit", "dividend", "interest paid",
+        "reimbursement", "venmo from", "zelle from", "freelance",
+    ],
+    "Housing": ["rent", "mortgage", "hoa", "property management", "apartments", "landlord"],
+    "Utilities": [
+        "electric", "utility", "utilities", "internet", "comcast", "xfinity", "verizon", "t-mobile",
+        "at&t", "sprint", "spectrum", "energy", "sewer", "trash",
+    ],
+    "Food & Dining": [
+        "starbucks", "coffee", "cafe", "restaurant", "pizza", "grill", "bakery", "diner",
+        "chipotle", "mcdonald", "subway", "panera", "five guys", "burger", "taco", "sushi",
+        "doordash", "grubhub", "uber eats", "whole foods", "trader joe", "kroger", "safeway",
+        "grocery", "supermarket", "blue apron",
+    ],
+    "Transportation": [
+        "uber", "lyft", "shell", "chevron", "exxon", "bp", "gas station", "fuel", "parking",
+        "transit", "metro", "toll",
+    ],
+    "Travel": ["airline", "airlines", "hotel", "marriott", "hilton", "airbnb", "expedia"],
+    "Electronics": ["best buy", "electronics", "apple store"],
+    "Shopping": ["amazon", "target", "walmart", "costco", "ebay", "etsy", "ikea", "store"],
+    "Healthcare": ["cvs", "walgreens", "pharmacy", "clinic", "dental", "hospital", "medical"],
+    "Health & Fitness": ["fitness", "gym", "yoga", "planet fitness"],
+    "Entertainment": [
+        "netflix", "spotify", "hulu", "disney", "audible", "youtube", "cinema", "theater",
+        "theatre", "steam", "playstation", "xbox",
+    ],
+    "Business": ["adobe", "linkedin", "github", "slack", "zoom", "microsoft", "aws"],
+    "Technology": ["icloud", "google storage", "dropbox"],
+    "Personal Care": ["salon", "barber", "spa", "shave"],
+}
+# Category of merchants with only incoming amounts that no keyword matches
+INCOME_CATEGORY = "Income"
+# What the rollup and analytics call transactions without a category
+UNCATEGORIZED = "Uncategorized"
@@ -1,16 +1,79 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./financial_data.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financial_data.db")
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30}
 )
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets dashboard reads proceed while uploads and deletes write.
+    # auto_vacuum only takes effect on a new file (or after VACUUM, see maintenance.compact)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Columns added after the first release: (table, column, DDL, backfill SQL).
+# create_all() never alters an existing table, so these are applied by hand.
+COLUMN_MIGRATIONS = [
+    (
+        "transactions",
+        "timestamp",
+        "ALTER TABLE transactions ADD COLUMN timestamp INTEGER NOT NULL DEFAULT 0",
+        "UPDATE transactions SET timestamp = CAST(strftime('%s', date) AS INTEGER)",
+    ),
+    (
+        "upload_jobs",
+        "file_results",
+        "ALTER TABLE upload_jobs ADD COLUMN file_results TEXT",
+        None,
+    ),
+    # Resolved by merchants.backfill_merchant_ids at startup
+    (
+        "transactions",
+        "merchant_id",
+        "ALTER TABLE transactions ADD COLUMN merchant_id INTEGER REFERENCES merchants (id)",
+        None,
+    ),
+    (
+        "subscription_registry",
+        "merchant_id",
+        "ALTER TABLE subscription_registry ADD COLUMN merchant_id INTEGER",
+        None,
+    ),
+    (
+        "upload_jobs",
+        "owner",
+        "ALTER TABLE upload_jobs ADD COLUMN owner TEXT",
+        None,
+    ),
+]
+
+def migrate():
+    """
+    Bring an existing database up to the current schema
+    """
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl, backfill in COLUMN_MIGRATIONS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column in existing:
+                continue
+            conn.execute(text(ddl))
+            if backfill:
+                conn.execute(text(backfill))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"))
+
 def get_db():
     db = SessionLocal()
     try:
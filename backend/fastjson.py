@@ -0,0 +1,63 @@
+import json
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
+
+# orjson writes dicts, lists, numpy scalars and datetimes straight to bytes.
+# Without it the standard library encoder produces the same JSON, only slower.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # numpy scalar
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def frame_records(df):
+    """
+    DataFrame to a list of row dicts, converting column by column instead of
+    boxing every cell like to_dict(orient="records"). Datetime columns become
+    datetime objects (NaT as None).
+    """
+    columns = []
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if values.dtype.kind == "M":
+            values = values.astype("datetime64[us]")
+        columns.append(values.tolist())
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def row_records(rows, fields):
+    """Row tuples (e.g. from a column query) to dicts keyed by fields"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def sse_stream(events):
+    """(event, data) pairs to Server-Sent Events bytes, one JSON data line each"""
+    for event, data in events:
+        yield b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for trusted internal data. Returning it from an endpoint
+    bypasses FastAPI's jsonable_encoder and response_model validation, so the
+    content must already be plain dicts/lists of JSON-compatible values.
+    """
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,173 @@
+import io
+import os
+import zipfile
+import pandas as pd
+from columnar import read_table
+from constants import ARCHIVE_EXTENSIONS, SUPPORTED_EXTENSIONS
+from models import Transaction
+
+REQUIRED_COLUMNS = ['date', 'merchant', 'amount']
+INSERT_COLUMNS = ['date', 'timestamp', 'merchant', 'amount', 'description', 'category', 'merchant_id']
+INSERT_CHUNK_SIZE = 5000
+# Rows from different files of one upload with the same values here are one transaction
+DEDUPE_COLUMNS = ['timestamp', 'merchant', 'amount']
+# Uncompressed size limit for a zip upload
+MAX_ARCHIVE_BYTES = int(os.getenv("MAX_ARCHIVE_BYTES", str(2 * 1024 ** 3)))
+
+
+def is_supported_file(filename):
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def expand_archive(filename, contents):
+    """
+    [(filename, bytes), ...] for the supported files in a zip upload, or the
+    upload itself when it is not an archive
+    """
+    if not is_archive(filename):
+        return [(filename, contents)]
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(contents))
+    except zipfile.BadZipFile:
+        raise ValueError(f"{filename} is not a valid zip archive")
+
+    members = [
+        m for m in archive.infolist()
+        if not m.is_dir()
+        and not os.path.basename(m.filename).startswith(".")
+        and not m.filename.startswith("__MACOSX/")
+        and is_supported_file(m.filename)
+    ]
+    if not members:
+        raise ValueError(f"{filename} contains no {', '.join(SUPPORTED_EXTENSIONS)} files")
+    if sum(m.file_size for m in members) > MAX_ARCHIVE_BYTES:
+        raise ValueError(f"{filename} expands to more than {MAX_ARCHIVE_BYTES} bytes")
+    return [(m.filename, archive.read(m)) for m in sorted(members, key=lambda m: m.filename)]
+
+
+def read_transactions(filename, contents):
+    """
+    Parse an uploaded CSV, Parquet or Arrow IPC file into a raw DataFrame
+    """
+    filename = filename.lower()
+    if not is_supported_file(filename):
+        raise ValueError(f"Unsupported file type, expected one of: {', '.join(SUPPORTED_EXTENSIONS)}")
+    if not filename.endswith('.csv'):
+        return read_table(filename, contents)
+    try:
+        return pd.read_csv(io.BytesIO(contents))
+    except pd.errors.EmptyDataError:
+        raise ValueError("CSV file is empty")
+
+
+def parse_times(values):
+    """
+    Parse date strings once, falling back to per-value inference only for
+    rows that are not ISO 8601
+    """
+    times = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    retry = times.isna() & values.notna()
+    if retry.any():
+        times[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_convert(None)
+    return times
+
+
+def prepare_transactions(df):
+    """
+    Validate and normalize a raw upload into insertable columns. category is
+    optional; missing categories are filled in at ingest (categorize.py).
+    Returns (frame, skipped_rows).
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    times = parse_times(df['date'])
+    amounts = pd.to_numeric(df['amount'], errors="coerce")
+    valid = times.notna() & amounts.notna() & df['merchant'].notna()
+
+    times = times[valid]
+    description = df['description'][valid] if 'description' in df.columns else pd.Series(None, index=times.index)
+    category = df['category'][valid] if 'category' in df.columns else pd.Series(None, index=times.index)
+
+    frame = pd.DataFrame({
+        "timestamp": (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1),
+        "merchant": df['merchant'][valid].astype(str),
+        "amount": amounts[valid].astype(float),
+        "description": optional_text(description),
+        "category": optional_text(category),
+    })
+
+    return frame.reset_index(drop=True), int((~valid).sum())
+
+
+def parse_file(filename, contents):
+    """
+    Read and prepare one uploaded file. Module-level so upload jobs can run it
+    in worker processes. Returns (frame, skipped_rows).
+    """
+    try:
+        return prepare_transactions(read_transactions(filename, contents))
+    except Exception as e:
+        raise ValueError(f"{filename}: {e}") from None
+
+
+def merge_files(frames):
+    """
+    Concatenate the prepared frames of one upload, dropping rows that an
+    earlier file already contains (overlapping statements). Repeats within a
+    file are kept: the n-th occurrence of a row in a later file is only a
+    duplicate when an earlier file has at least n of them.
+    Returns (frame, duplicates per file).
+    """
+    if len(frames) == 1:
+        return frames[0], [0]
+
+    merged = pd.concat(frames, keys=range(len(frames)), names=["file", None]).reset_index(level=0)
+    merged["occurrence"] = merged.groupby(["file"] + DEDUPE_COLUMNS, sort=False).cumcount()
+    duplicate = merged.duplicated(DEDUPE_COLUMNS + ["occurrence"])
+    duplicates = duplicate.groupby(merged["file"]).sum().reindex(range(len(frames)), fill_value=0)
+
+    frame = merged[~duplicate].drop(columns=["file", "occurrence"]).reset_index(drop=True)
+    return frame, [int(n) for n in duplicates]
+
+
+def optional_text(values):
+    """
+    Stringify a column, keeping missing values as None rather than "nan"
+    """
+    return values.astype(str).astype(object).where(values.notna(), None)
+
+
+def insert_transactions(db, frame, progress=None):
+    """
+    Bulk insert prepared rows in chunks without committing, so the caller
+    decides the transaction boundary. Rows go to the driver as plain tuples
+    built column-wise, skipping per-row dicts and ORM objects.
+    Returns (transactions_added, total_amount).
+    """
+    timestamps = frame["timestamp"].to_numpy()
+    # The Date column is stored by SQLite as ISO text; derive it from the epoch in one pass
+    dates = (timestamps // 86400).astype("datetime64[D]").astype(str).tolist()
+    columns = [dates] + [frame[c].tolist() for c in INSERT_COLUMNS[1:]]
+    statement = (
+        f"INSERT INTO {Transaction.__tablename__} ({', '.join(INSERT_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})"
+    )
+
+    rows = list(zip(*columns))
+    connection = db.connection()
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        connection.exec_driver_sql(statement, chunk)
+        if progress:
+            progress(start + len(chunk))
+
+    return len(rows), round(float(frame["amount"].sum()), 2)
@@ -0,0 +1,274 @@
+import json
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cache
+import merchants
+from database import SessionLocal
+from metrics import stage
+from models import UploadJob, UploadJobFile
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+# Worker processes that parse the files of multi-file uploads in parallel
+PARSE_PROCESSES = int(os.getenv("UPLOAD_PARSE_PROCESSES", str(os.cpu_count() or 1)))
+
+# Recomputation steps run with a fresh session after every successful ingest
+_post_ingest_hooks = []
+
+
+def post_ingest(hook):
+    """
+    Register hook(db) to run after each upload job has committed its rows
+    """
+    _post_ingest_hooks.append(hook)
+    return hook
+
+
+def _orphaned(owner):
+    """
+    Whether the process that claimed a running job is gone. Only processes on
+    this host can be checked; a job claimed on another host is left alone.
+    """
+    if owner is None:
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        # Claimed by an earlier process that had our pid (resume runs before we claim anything)
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class JobQueue:
+    """
+    Upload jobs persisted in SQLite and processed by a background thread pool.
+
+    Parsing runs in parallel across workers; inserts are serialized because
+    SQLite allows a single writer. The files of a multi-file or zip upload
+    are parsed in parallel worker processes, merged and deduplicated, and
+    inserted as one job. A job's rows, its new merchants, its subscription
+    registry and daily rollup updates, its stage change and the removal of
+    its raw files are committed together, so a job interrupted by a restart
+    is either re-ingested from scratch or only recomputed.
+    """
+
+    def __init__(self, workers=UPLOAD_WORKERS):
+        self.workers = workers
+        self.owner = None
+        self._executor = None
+        self._write_lock = threading.Lock()
+        self._progress = {}
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+
+    def start(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload")
+        self.resume()
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    def enqueue(self, files):
+        """
+        Persist a job for [(filename, bytes), ...] and schedule it
+        """
+        db = SessionLocal()
+        try:
+            job = UploadJob(status="queued", stage="queued")
+            db.add(job)
+            db.flush()
+            for filename, content in files:
+                db.add(UploadJobFile(job_id=job.id, filename=filename, content=content))
+            db.commit()
+            db.refresh(job)
+        finally:
+            db.close()
+
+        self._executor.submit(self._run, job.id, "queued", None)
+        return job
+
+    def resume(self):
+        """
+        Schedule queued jobs and running jobs whose process is gone. Other
+        server processes may be resuming too; each job runs in the one that
+        claims it first.
+        """
+        db = SessionLocal()
+        try:
+            pending = db.query(UploadJob.id, UploadJob.status, UploadJob.owner)\
+                .filter(UploadJob.status.in_(["queued", "running"]))\
+                .order_by(UploadJob.id)\
+                .all()
+        finally:
+            db.close()
+
+        for job_id, status, owner in pending:
+            if status == "queued" or _orphaned(owner):
+                self._executor.submit(self._run, job_id, status, owner)
+
+    def rows_processed(self, job):
+        if job.id in self._progress:
+            return self._progress[job.id]
+        return job.transactions_added
+
+    def _claim(self, db, job_id, status, owner):
+        """
+        Take the job for this process if it still has the status and owner it
+        was scheduled with; False if another process got there first
+        """
+        claimed = db.query(UploadJob)\
+            .filter(UploadJob.id == job_id, UploadJob.status == status, UploadJob.owner.is_(owner))\
+            .update({"status": "running", "owner": self.owner}, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _set_stage(self, db, job, stage):
+        job.status = "running"
+        job.stage = stage
+        db.commit()
+
+    def _run(self, job_id, status, owner):
+        db = SessionLocal()
+        try:
+            if not self._claim(db, job_id, status, owner):
+                return
+            job = db.get(UploadJob, job_id)
+
+            if job.stage != "recomputing":
+                self._ingest(db, job)
+
+            self._recompute(db, job)
+            job.status = "completed"
+            job.stage = "done"
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            # Merchants resolved in the rolled-back transaction may be cached
+            merchants.reset()
+            job = db.get(UploadJob, job_id)
+            job.status = "failed"
+            job.error = str(e)
+            db.query(UploadJobFile).filter(UploadJobFile.job_id == job_id).delete()
+            db.commit()
+
+        finally:
+            self._progress.pop(job_id, None)
+            db.close()
+
+    def _parser(self):
+        """
+        The process pool, started on first use. Spawned rather than forked:
+        the server process runs threads.
+        """
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=PARSE_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._parse_pool
+
+    def _parse(self, files):
+        """
+        [(frame, skipped_rows), ...] in file order; in worker processes when
+        there are several files
+        """
+        from ingest import parse_file
+
+        if len(files) == 1 or PARSE_PROCESSES <= 1:
+            return [parse_file(filename, content) for filename, content in files]
+        pool = self._parser()
+        futures = [pool.submit(parse_file, filename, content) for filename, content in files]
+        try:
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next job
+            with self._parse_pool_lock:
+                if self._parse_pool is pool:
+                    self._parse_pool = None
+            raise
+
+    def _ingest(self, db, job):
+        from ingest import expand_archive, merge_files, insert_transactions
+        from categorize import categorize
+        from merchants import resolve_merchants
+        from registry import update_registry
+        from rollup import update_rollup
+
+        self._set_stage(db, job, "parsing")
+
+        files = []
+        for f in db.query(UploadJobFile).filter(UploadJobFile.job_id == job.id).order_by(UploadJobFile.id):
+            files.extend(expand_archive(f.filename, f.content))
+        with stage("upload.parse") as s:
+            parsed = self._parse(files)
+            frame, duplicates = merge_files([file_frame for file_frame, _ in parsed])
+            skipped = sum(rows_skipped for _, rows_skipped in parsed)
+            s.rows = sum(len(file_frame) for file_frame, _ in parsed) + skipped
+
+        job.file_results = json.dumps([
+            {
+                "filename": filename,
+                "rows_total": len(file_frame) + rows_skipped,
+                "rows_skipped": rows_skipped,
+                "duplicates": file_duplicates,
+                "transactions_added": len(file_frame) - file_duplicates,
+            }
+            for (filename, _), (file_frame, rows_skipped), file_duplicates in zip(files, parsed, duplicates)
+        ])
+        job.rows_total = s.rows
+        job.rows_skipped = skipped
+        self._set_stage(db, job, "ingesting")
+
+        with self._write_lock:
+            self._progress[job.id] = 0
+
+            def progress(n):
+                self._progress[job.id] = n
+
+            with stage("upload.merchants", rows=len(frame)):
+                frame["merchant_id"], names = resolve_merchants(db, frame["merchant"])
+            with stage("upload.categorize", rows=len(frame)):
+                frame["category"] = categorize(db, frame.assign(merchant=names))
+            with stage("upload.insert", rows=len(frame)):
+                added, total_amount = insert_transactions(db, frame, progress)
+                job.transactions_added = added
+                job.total_amount = total_amount
+            with stage("upload.registry", rows=len(frame)):
+                update_registry(db, frame.assign(merchant=names))
+            with stage("upload.rollup", rows=len(frame)):
+                update_rollup(db, frame)
+
+            job.stage = "recomputing"
+            db.query(UploadJobFile).filter(UploadJobFile.job_id == job.id).delete()
+            cache.bump_version(db)
+            db.commit()
+
+    def _recompute(self, db, job):
+        for hook in _post_ingest_hooks:
+            try:
+                with stage(f"upload.{hook.__name__}"):
+                    hook(db)
+            except Exception as e:
+                # Analytics can legitimately fail on sparse data; the upload itself succeeded
+                print(f"Post-ingest step {hook.__name__} failed for job {job.id}: {e}")
+                db.rollback()
+
+
+upload_queue = JobQueue()
@@ -1,27 +1,84 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from prophet import Prophet
-import pandas as pd
-from ml.forecast import forecast
-from ml.subscriptions import subscriptions
-from ml.anomalies import detect_anomalies
-from ml.generalInsights import generalInsights
-from ml.trends import trends
-import io
-from dateutil.relativedelta import relativedelta
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import contextvars
+import json
+import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from database import engine, get_db, Base
-from models import Transaction
-from schemas import TransactionResponse, UploadResponse
-
-Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Financial Coach API")
+from database import SessionLocal, get_db, migrate
+from models import Merchant, SubscriptionEvent, Transaction, UploadJob
+from schemas import TransactionResponse, JobResponse
+from jobs import upload_queue, post_ingest
+from constants import ARCHIVE_EXTENSIONS, SUPPORTED_EXTENSIONS
+from columnar import EXPORT_FORMATS, export_stream, require_pyarrow
+from maintenance import (
+    RETENTION_MONTHS, apply_retention, compact, delete_transactions,
+    purge_transactions, range_filter, timestamp_range,
+)
+from merchants import backfill_merchant_ids, clear_merchants
+from registry import rebuild_registry, registry_needs_rebuild, registry_subscriptions, subscription_charge_months
+from rollup import rebuild_rollup, rollup_needs_rebuild
+import rollup
+import cache
+import metrics
+from metrics import stage
+from fastjson import FastJSONResponse, frame_records, row_records, sse_stream
+
+migrate()
+
+# Upper bound on pages released per automatic compaction, to keep the write lock short
+COMPACT_PAGES = 2000
+
+# pandas, scikit-learn, Prophet and OpenAI are imported by the ml/ modules on
+# first use, so /api/health answers without paying for them. WARMUP=1 imports
+# them in the background right after startup instead of on the first request.
+WARMUP = os.getenv("WARMUP", "0") == "1"
+HEAVY_MODULES = [
+    "ingest", "ml.ledger", "ml.subscriptions", "ml.anomalies", "ml.forecast", "ml.trends",
+    "ml.generalInsights", "ml.projection", "sklearn.ensemble", "prophet", "openai",
+]
+
+def warm_up():
+    import importlib
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Warm-up could not import {module}: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with SessionLocal() as db:
+        backfilled = backfill_merchant_ids(db)
+        if backfilled:
+            print(f"Resolved canonical merchants for {backfilled} existing transactions")
+        if registry_needs_rebuild(db):
+            print("Building the subscription registry from existing transactions")
+            rebuild_registry(db)
+        if rollup_needs_rebuild(db):
+            print("Building the daily rollup from existing transactions")
+            rebuild_rollup(db)
+    if compact(pages=COMPACT_PAGES, switch_mode=True)["full_vacuum"]:
+        print("Switched the database to incremental auto-vacuum")
+    upload_queue.start()
+    if WARMUP:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    yield
+    upload_queue.shutdown()
+
+app = FastAPI(title="Financial Coach API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,8 +86,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile", "ETag"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Observe request latency per route. Requests sent with `X-Profile: 1` get
+    their stage timings and row counts back in the Server-Timing and X-Profile
+    response headers; `X-Profile: memory` also reports peak traced memory.
+    """
+    mode = request.headers.get(metrics.PROFILE_HEADER)
+    profiling = mode in ("1", "memory")
+    token = metrics.start_profile(trace_memory=mode == "memory") if profiling else None
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        if profiling:
+            metrics.finish_profile(token, time.perf_counter() - started)
+        raise
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    route_path = route.path if route else "unmatched"
+    metrics.request_latency.observe((request.method, route_path, str(response.status_code)), elapsed)
+    if profiling:
+        profile = metrics.finish_profile(token, elapsed)
+        if profile["peak_memory_bytes"] is not None:
+            metrics.peak_memory.observe((route_path,), profile["peak_memory_bytes"])
+        response.headers.update(metrics.profile_headers(profile))
+
+    return response
+
+# Clients may keep analytics responses but must revalidate them with If-None-Match
+ANALYTICS_CACHE_CONTROL = "private, no-cache"
+
+def data_version_etag(request: Request, response: Response):
+    """
+    Conditional GET for analytics endpoints. The ETag is the data version,
+    which every upload and delete bumps, so a matching If-None-Match is
+    answered with 304 before the database or ml/ code is touched.
+    """
+    etag = f'"v{cache.data_version()}"'
+    headers = {"ETag": etag, "Cache-Control": ANALYTICS_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in candidates or "*" in candidates:
+            raise HTTPException(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus text exposition of request and pipeline stage metrics
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Financial Coach API!"}
@@ -47,69 +162,67 @@ async def check_transactions_exist(db: Session = Depends(get_db)):
     count = db.query(Transaction).count()
     return {"has_data": count > 0, "count": count}
 
-@app.post("/api/transactions/upload", response_model=UploadResponse)
+@app.post("/api/transactions/upload", response_model=JobResponse, status_code=202)
 async def upload_transactions(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    file: Optional[UploadFile] = File(None),
+    files: List[UploadFile] = File([]),
 ):
     """
-    Upload a CSV file containing transaction data.
-    Expected CSV columns: date, merchant, amount, description
+    Queue CSV, Parquet or Arrow IPC files, or zip archives of them, for background ingest.
+    Send one `file` and/or several `files`; they are parsed in parallel, merged with rows
+    repeated across files dropped, and inserted as one job.
+    Expected columns: date, merchant, amount, category, description (optional)
+    Poll GET /api/jobs/{job_id} for progress and per-file counts.
     """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-
-    try:
-        # Read the CSV file
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-
-        # Validate required columns
-        required_columns = ['date', 'merchant', 'amount']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
+    uploads = ([file] if file else []) + files
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    for upload in uploads:
+        if not upload.filename.lower().endswith(SUPPORTED_EXTENSIONS + ARCHIVE_EXTENSIONS):
             raise HTTPException(
                 status_code=400,
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
+                detail=f"{upload.filename}: only {', '.join(SUPPORTED_EXTENSIONS + ARCHIVE_EXTENSIONS)} files are allowed"
             )
 
-        if 'description' not in df.columns:
-            df['description'] = None
+    job = upload_queue.enqueue([(upload.filename, await upload.read()) for upload in uploads])
 
-        transactions_added = 0
-        total_amount = 0.0
+    return job_response(job)
 
-        for _, row in df.iterrows():
-            try:
-                transaction_date = pd.to_datetime(row['date']).date()
-                transaction = Transaction(
-                    date=transaction_date,
-                    merchant=str(row['merchant']),
-                    amount=float(row['amount']),
-                    category=str(row['category'])
-                )
-
-                db.add(transaction)
-                transactions_added += 1
-                total_amount += float(row['amount'])
-
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
-
-        db.commit()
-
-        return UploadResponse(
-            message=f"Successfully uploaded {transactions_added} transactions",
-            transactions_added=transactions_added,
-            total_amount=round(total_amount, 2)
-        )
-
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="CSV file is empty")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the status, progress and result counts of an upload job
+    """
+    job = db.get(UploadJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_response(job)
+
+def job_response(job):
+    if job.status == "completed":
+        message = f"Successfully uploaded {job.transactions_added} transactions"
+    elif job.status == "failed":
+        message = f"Upload failed: {job.error}"
+    else:
+        message = f"Upload {job.stage}"
+
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        rows_total=job.rows_total,
+        rows_processed=upload_queue.rows_processed(job),
+        rows_skipped=job.rows_skipped,
+        transactions_added=job.transactions_added,
+        total_amount=job.total_amount,
+        error=job.error,
+        files=json.loads(job.file_results) if job.file_results else None,
+        message=message
+    )
+
+TRANSACTION_RESPONSE_FIELDS = list(TransactionResponse.model_fields)
+TRANSACTION_RESPONSE_COLUMNS = [getattr(Transaction, name) for name in TRANSACTION_RESPONSE_FIELDS]
 
 @app.get("/api/transactions", response_model=List[TransactionResponse])
 async def get_transactions(
@@ -121,133 +234,469 @@ async def get_transactions(
     """
     Get all transactions with pagination
     """
-    query = db.query(Transaction)
+    # Plain column rows straight to JSON: no ORM objects and no per-row model
+    # validation; response_model still documents the shape
+    query = db.query(*TRANSACTION_RESPONSE_COLUMNS)
 
     if expenses_only:
         query = query.filter(Transaction.amount < 0)
 
-    transactions = query\
-        .order_by(Transaction.date.desc())\
+    rows = query\
+        .order_by(Transaction.timestamp.desc())\
         .offset(skip)\
         .limit(limit)\
         .all()
 
-    return [
-        TransactionResponse(
-            id=t.id,
-            date=t.date,
-            merchant=t.merchant,
-            amount=t.amount,
-            description=t.description,
-            category=t.category,
-            created_at=t.created_at.isoformat() if t.created_at else None
+    return FastJSONResponse(row_records(rows, TRANSACTION_RESPONSE_FIELDS))
+
+@app.get("/api/transactions/export")
+def export_transactions(
+    format: str = "parquet",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    """
+    Stream the transactions table as Parquet, Arrow IPC stream or CSV,
+    optionally limited to dates between start and end (inclusive)
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
         )
-        for t in transactions
-    ]
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    conditions = range_filter(*timestamp_range(start, end))
+
+    # The stream outlives the request scope, so it owns its session
+    def stream():
+        db = SessionLocal()
+        try:
+            yield from export_stream(db, format, conditions)
+        finally:
+            db.close()
+
+    extension = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{extension}"'}
+    )
+
+def check_date_range(start, end):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+def range_summary(start=None, end=None):
+    """
+    Read from the daily rollup. Uses its own session so the dashboard can run
+    it on a worker thread.
+    """
+    with SessionLocal() as db, stage("summary.rollup"):
+        return rollup.summary(db, start, end)
 
-@app.get("/api/transactions/summary")
-async def get_transaction_summary(db: Session = Depends(get_db)):
+@app.get("/api/transactions/summary", dependencies=[Depends(data_version_etag)])
+async def get_transaction_summary(start: Optional[date] = None, end: Optional[date] = None):
     """
-    Get summary statistics focusing on expenses (negative amounts)
+    Get summary statistics focusing on expenses (negative amounts), optionally
+    for transactions dated between start and end (inclusive)
     """
-    all_transactions = db.query(Transaction).all()
-    expenses = [t for t in all_transactions if t.amount < 0]
-    income = [t for t in all_transactions if t.amount >= 0]
+    check_date_range(start, end)
+    return range_summary(start=start, end=end)
 
-    if not expenses:
-        return {
-            "total_transactions": 0,
-            "total_expenses": 0.0,
-            "total_income": sum(t.amount for t in income),
-            "average_expense": 0.0,
-            "date_range": None
-        }
+@app.get("/api/transactions/categories", dependencies=[Depends(data_version_etag)])
+async def get_category_breakdown(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Spending per category between start and end (inclusive), largest first
+    """
+    check_date_range(start, end)
+    with stage("categories.rollup"):
+        return rollup.category_breakdown(db, start, end)
+
+def period_comparison(days=30, end=None):
+    with SessionLocal() as db, stage("compare.rollup"):
+        comparison = rollup.compare_periods(db, days, end)
+    if comparison is None:
+        raise HTTPException(status_code=400, detail="No transaction data available")
+    return comparison
 
-    total_expenses = abs(sum(t.amount for t in expenses))
-    total_income = sum(t.amount for t in income)
-    dates = [t.date for t in expenses if t.date]
-
-    return {
-        "total_transactions": len(expenses),
-        "total_expenses": round(total_expenses, 2),
-        "total_income": round(total_income, 2),
-        "average_expense": round(total_expenses / len(expenses), 2),
-        "date_range": {
-            "start": min(dates).isoformat() if dates else None,
-            "end": max(dates).isoformat() if dates else None
-        }
-    }
+@app.get("/api/transactions/compare", dependencies=[Depends(data_version_etag)])
+async def compare_periods(days: int = 30, end: Optional[date] = None):
+    """
+    Spending and income over the `days` days ending at end (default: the last
+    day with transactions) against the `days` days before, overall and per category
+    """
+    if days <= 0:
+        raise HTTPException(status_code=400, detail="days must be positive")
+    return period_comparison(days=days, end=end)
 
 @app.delete("/api/transactions/all")
-async def delete_all_transactions(db: Session = Depends(get_db)):
+def delete_all_transactions(db: Session = Depends(get_db)):
     """
     Delete all transactions and end session
     """
-    count = db.query(Transaction).delete()
-    db.commit()
+    count = delete_transactions(db)
+    rebuild_registry(db)
+    rebuild_rollup(db)
+    clear_merchants(db)
+    compact(pages=COMPACT_PAGES)
     return {"message": f"Deleted {count} transactions"}
 
+@app.delete("/api/transactions")
+def delete_transactions_in_range(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    archive: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Delete transactions dated between start and end (inclusive), in chunks.
+    With archive=true the rows are first written to a Parquet file.
+    """
+    if start is None and end is None:
+        raise HTTPException(status_code=400, detail="Provide start and/or end, or use /api/transactions/all")
+
+    start_ts, end_ts = timestamp_range(start, end)
+    try:
+        result = purge_transactions(db, start_ts, end_ts, archive=archive)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"message": f"Deleted {result['deleted']} transactions", **result}
+
+@app.post("/api/maintenance/retention")
+def run_retention(
+    keep_months: int = RETENTION_MONTHS,
+    archive: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Delete (optionally archiving) transactions older than keep_months, then compact
+    """
+    if keep_months <= 0:
+        raise HTTPException(status_code=400, detail="keep_months must be positive")
 
-@app.get("/api/forecast/monthly")
+    try:
+        result = apply_retention(db, keep_months, archive=archive)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["compaction"] = compact(pages=COMPACT_PAGES)
+
+    return result
+
+@app.post("/api/maintenance/compact")
+def run_compaction(pages: Optional[int] = None):
+    """
+    Return free database pages to the filesystem (incremental VACUUM), first
+    switching a database from before incremental auto-vacuum with a full VACUUM
+    """
+    return compact(pages=pages, switch_mode=True)
+
+@post_ingest
+def enforce_retention(db):
+    """
+    Apply the RETENTION_MONTHS rolling window after each upload, if configured
+    """
+    if RETENTION_MONTHS > 0:
+        apply_retention(db, RETENTION_MONTHS)
+
+
+# Analytics see the canonical merchant name, not the raw descriptor
+LEDGER_COLUMNS = (
+    Transaction.id, Transaction.timestamp, Transaction.date, Transaction.merchant_id,
+    func.coalesce(Merchant.name, Transaction.merchant).label("merchant"), Transaction.amount, Transaction.category,
+)
+
+def load_ledger_rows(db, expenses_only=False):
+    """
+    Read transactions as plain rows in one column query, time-ordered straight
+    off the timestamp index so the gap rules need no re-sort
+    """
+    with stage("db.load_ledger") as s:
+        query = db.query(*LEDGER_COLUMNS).outerjoin(Merchant, Transaction.merchant_id == Merchant.id)
+        if expenses_only:
+            query = query.filter(Transaction.amount < 0)
+        rows = query.order_by(Transaction.timestamp, Transaction.id).all()
+        s.rows = len(rows)
+    return rows
+
+def load_ledger(db, expenses_only=False):
+    """The transaction rows with the frames built from them (see ml.ledger.Ledger)"""
+    from ml.ledger import Ledger
+
+    rows = load_ledger_rows(db, expenses_only)
+    with stage("ledger.build", rows=len(rows)):
+        return Ledger(rows)
+
+def lazy_ledger(db, expenses_only=False):
+    from ml.ledger import LazyLedger
+    return LazyLedger(lambda: load_ledger(db, expenses_only))
+
+# The cached_* helpers take a callable returning the Ledger, so a cache hit
+# never touches the database and callers computing several results share one load
+
+def cached_forecast(ledger):
+    def compute():
+        data = ledger()
+        if data.expenses.empty and data.income.empty:
+            raise HTTPException(status_code=400, detail="Not enough data to forecast.")
+
+        from ml.forecast import forecast
+        return forecast(data.expenses, data.income)
+
+    return cache.get_or_compute("forecast", compute)
+
+def cached_subscriptions():
+    """
+    Read from the incrementally maintained registry. Uses its own session so
+    it is safe from any dashboard thread.
+    """
+    def compute():
+        with SessionLocal() as db, stage("subscriptions.registry"):
+            return registry_subscriptions(db)
+
+    return cache.get_or_compute("subscriptions", compute)
+
+def cached_fraud_detections(ledger):
+    def compute():
+        from ml.anomalies import detect_anomalies
+
+        subs = cached_subscriptions()["subscriptions"]
+        suspicious = detect_anomalies(ledger().expenses, subs)
+        with stage("fraud.serialize", rows=len(suspicious)):
+            return frame_records(suspicious)
+
+    return cache.get_or_compute("fraud-detections", compute)
+
+def trend_aggregates(start=None, end=None):
+    """
+    Monthly and per-category totals from the daily rollup; no ledger needed
+    """
+    with SessionLocal() as db, stage("trends.rollup"):
+        monthly_data, category_spending = rollup.monthly_breakdown(db, start, end)
+    if not monthly_data:
+        raise HTTPException(status_code=400, detail="No transaction data available")
+    return monthly_data, category_spending
+
+def analyze_trends(start=None, end=None):
+    monthly_data, category_spending = trend_aggregates(start, end)
+
+    from ml.trends import trends
+    # Includes the trends.llm stage; the difference is prompt building
+    with stage("trends.analyze"):
+        return trends(monthly_data, category_spending)
+
+@post_ingest
+def refresh_analytics(db):
+    """
+    Refit the forecast and anomaly models as soon as new data lands
+    """
+    ledger = lazy_ledger(db)
+    cached_subscriptions()
+    cached_forecast(ledger)
+    cached_fraud_detections(ledger)
+
+
+@app.get("/api/forecast/monthly", dependencies=[Depends(data_version_etag)])
 async def forecast_monthly_expenses(db: Session = Depends(get_db)):
     """
     Forecast next month's total expenses and income using Prophet.
     Returns historical monthly totals + predictions for both.
     """
 
-    all_transactions = db.query(Transaction).all()
-    expenses = [t for t in all_transactions if t.amount < 0]
-    income_transactions = [t for t in all_transactions if t.amount > 0]  # Changed from >= 0 to > 0
+    return cached_forecast(lazy_ledger(db))
+
 
-    if not expenses and not income_transactions:
-        raise HTTPException(status_code=400, detail="Not enough data to forecast.")
+@app.get("/api/forecast/projection", dependencies=[Depends(data_version_etag)])
+def project_cash_flow(
+    months: int = 6,
+    paths: int = 20000,
+    balance: float = 0.0,
+    history_months: int = 12,
+    seed: int = 0
+):
+    """
+    Monte Carlo cash-flow projection: simulate `paths` futures of `months`
+    months by drawing each category's spending and the income from the last
+    `history_months` whole months, with subscriptions as fixed outflows.
+    Returns the probability of the balance (starting at `balance`) going
+    negative and balance/savings percentiles. A fixed seed keeps responses
+    reproducible for a given data version.
+    """
+    if not 1 <= months <= 60:
+        raise HTTPException(status_code=400, detail="months must be between 1 and 60")
+    if not 100 <= paths <= 200000:
+        raise HTTPException(status_code=400, detail="paths must be between 100 and 200000")
+    if history_months <= 0:
+        raise HTTPException(status_code=400, detail="history_months must be positive")
+
+    with SessionLocal() as db, stage("projection.rollup"):
+        start, end = rollup.complete_months(db)
+        # Too short for a whole month: use what there is
+        monthly_data, _ = rollup.monthly_breakdown(db, start, end) if start else rollup.monthly_breakdown(db)
+        charge_months = subscription_charge_months(db)
+    if not monthly_data:
+        raise HTTPException(status_code=400, detail="No transaction data available")
 
-    return forecast(expenses, income_transactions)
+    from ml.projection import projection
+    subscriptions = cached_subscriptions()["subscriptions"]
+    return projection(monthly_data, subscriptions, charge_months, months, paths, balance, history_months, seed)
 
 
-@app.get("/api/subscriptions")
-async def get_recurring_expenses(db: Session = Depends(get_db)) -> Dict[str, Any]:
+@app.get("/api/subscriptions", dependencies=[Depends(data_version_etag)])
+async def get_recurring_expenses() -> Dict[str, Any]:
     """
     Detect recurring expenses (subscriptions)
     """
-  
-    expenses = db.query(Transaction).filter(Transaction.amount < 0).all()
-
-    return subscriptions(expenses)
-
-@app.get("/api/fraud-detections")
-def detect_fraud(db: Session = Depends(get_db)):
-    expenses = db.query(Transaction).filter(Transaction.amount < 0).all()
 
-    subscription_data = subscriptions(expenses) 
-    subs = subscription_data["subscriptions"]
+    return cached_subscriptions()
 
-    suspicious = detect_anomalies(expenses, subs)
+@app.get("/api/subscriptions/events")
+async def get_subscription_events(limit: int = 50, db: Session = Depends(get_db)):
+    """
+    Newest first: subscriptions detected and price changes, recorded as uploads land
+    """
+    events = db.query(SubscriptionEvent)\
+        .order_by(SubscriptionEvent.id.desc())\
+        .limit(limit)\
+        .all()
+    return [e.to_dict() for e in events]
 
-    return suspicious.to_dict(orient="records")
+@app.get("/api/fraud-detections", dependencies=[Depends(data_version_etag)])
+def detect_fraud(response: Response, db: Session = Depends(get_db)):
+    return FastJSONResponse(
+        cached_fraud_detections(lazy_ledger(db, expenses_only=True)),
+        headers=response.headers
+    )
 
-@app.get("/api/general-feedback")
+@app.get("/api/general-feedback", dependencies=[Depends(data_version_etag)])
 async def get_general_feedback(db: Session = Depends(get_db)):
     """
     Get AI-powered financial feedback based on spending patterns
     """
 
-    all_transactions = db.query(Transaction).all()
+    all_transactions = load_ledger_rows(db)
 
     if not all_transactions:
         raise HTTPException(status_code=400, detail="No transaction data available")
-    
-    return generalInsights(all_transactions)
 
+    from ml.generalInsights import generalInsights
+    # Includes the feedback.llm stage; the difference is local aggregation and prompt building
+    with stage("feedback.analyze", rows=len(all_transactions)):
+        return generalInsights(all_transactions)
 
-@app.get("/api/general-feedback-trends")
-def detect_fraud(db: Session = Depends(get_db)):
+
+@app.get("/api/general-feedback-trends", dependencies=[Depends(data_version_etag)])
+def detect_fraud(start: Optional[date] = None, end: Optional[date] = None):
     """
-    Get AI-powered financial trends feedback based on spending patterns
+    Get AI-powered financial trends feedback based on spending patterns,
+    optionally limited to transactions dated between start and end (inclusive)
     """
-    all_transactions = db.query(Transaction).all()
+    check_date_range(start, end)
+    return analyze_trends(start=start, end=end)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
+@app.get("/api/general-feedback/stream")
+def stream_general_feedback(db: Session = Depends(get_db)):
+    """
+    Server-Sent Events version of /api/general-feedback: a `summary` event
+    right after the local aggregation, then one `feedback` event per item as
+    the completion streams in, and finally `done` (or `error`)
+    """
+    all_transactions = load_ledger_rows(db)
     if not all_transactions:
         raise HTTPException(status_code=400, detail="No transaction data available")
-    
-    return trends(all_transactions)
\ No newline at end of file
+
+    from ml.generalInsights import feedback_request, stream_general_insights
+    with stage("feedback.analyze", rows=len(all_transactions)):
+        summary, messages = feedback_request(all_transactions)
+    return StreamingResponse(
+        sse_stream(stream_general_insights(summary, messages)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.get("/api/general-feedback-trends/stream")
+def stream_general_feedback_trends(start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Server-Sent Events version of /api/general-feedback-trends:
+    `calculated_trends` and `summary` events from the rollup at once, then one
+    `budget_item` event per item as the completion streams in, and finally
+    `done` (or `error`)
+    """
+    check_date_range(start, end)
+    monthly_data, category_spending = trend_aggregates(start, end)
+
+    from ml.trends import budget_request, stream_trends
+    with stage("trends.analyze"):
+        calculated_trends, summary, messages = budget_request(monthly_data, category_spending)
+    return StreamingResponse(
+        sse_stream(stream_trends(calculated_trends, summary, messages)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+DASHBOARD_SECTIONS = {
+    "summary": range_summary,
+    "subscriptions": cached_subscriptions,
+    "forecast": cached_forecast,
+    "fraud_detections": cached_fraud_detections,
+    "trends": analyze_trends,
+    "comparison": period_comparison,
+}
+# Sections computed from the transactions; the others read the rollup or registry
+LEDGER_SECTIONS = {"forecast", "fraud_detections"}
+
+def dashboard_section(compute, *args):
+    """
+    Run one dashboard section, reporting its failure in place of the result
+    """
+    try:
+        return compute(*args)
+    except HTTPException as e:
+        return {"error": e.detail, "status_code": e.status_code}
+    except Exception as e:
+        print(f"Dashboard section failed: {e}")
+        return {"error": str(e), "status_code": 500}
+
+@app.get("/api/dashboard", dependencies=[Depends(data_version_etag)])
+def get_dashboard(response: Response, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Summary, subscriptions, forecast, fraud detections, trends and the
+    last-30-days comparison in one response, each identical to its own
+    endpoint, computed concurrently. Forecast and fraud detections share one
+    read of the transactions, made only if either misses the cache; the other
+    sections read the daily rollup and subscription registry. A failing
+    section carries an error and status_code instead of failing the whole
+    response.
+
+    fields: comma-separated subset of sections (default: all)
+    """
+    names = list(DASHBOARD_SECTIONS) if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown dashboard fields: {', '.join(unknown)}. Choose from {', '.join(DASHBOARD_SECTIONS)}"
+        )
+
+    ledger = lazy_ledger(db)
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="dashboard") as pool:
+        # Each task runs in a copy of this context so profiled stages are still recorded
+        futures = {
+            name: pool.submit(
+                contextvars.copy_context().run, dashboard_section, DASHBOARD_SECTIONS[name],
+                *([ledger] if name in LEDGER_SECTIONS else [])
+            )
+            for name in names
+        }
+    return FastJSONResponse({name: futures[name].result() for name in names}, headers=response.headers)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, text
+import cache
+from columnar import iter_record_batches, require_pyarrow
+from database import engine
+from models import Transaction
+from registry import rebuild_registry
+from rollup import rebuild_rollup
+
+DELETE_CHUNK_SIZE = 5000
+ARCHIVE_CHUNK_SIZE = 50000
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+RETENTION_MONTHS = int(os.getenv("RETENTION_MONTHS", "0"))  # 0 keeps everything
+
+def day_start_timestamp(day):
+    return int(datetime.combine(day, time()).replace(tzinfo=timezone.utc).timestamp())
+
+
+def timestamp_range(start=None, end=None):
+    """
+    Convert an inclusive [start, end] date range into [start_ts, end_ts) epoch bounds
+    """
+    start_ts = day_start_timestamp(start) if start else None
+    end_ts = day_start_timestamp(end + timedelta(days=1)) if end else None
+    return start_ts, end_ts
+
+
+def range_filter(start_ts=None, end_ts=None, max_id=None):
+    conditions = []
+    if start_ts is not None:
+        conditions.append(Transaction.timestamp >= start_ts)
+    if end_ts is not None:
+        conditions.append(Transaction.timestamp < end_ts)
+    if max_id is not None:
+        conditions.append(Transaction.id <= max_id)
+    return conditions
+
+
+def delete_transactions(db, start_ts=None, end_ts=None, max_id=None, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Delete transactions in [start_ts, end_ts) a chunk at a time.
+    Each chunk is its own short write transaction, so concurrent readers and
+    uploads are never blocked for the length of the whole delete.
+    """
+    conditions = range_filter(start_ts, end_ts, max_id)
+    deleted = 0
+    while True:
+        ids = select(Transaction.id).where(*conditions).limit(chunk_size)
+        count = db.query(Transaction)\
+            .filter(Transaction.id.in_(ids))\
+            .delete(synchronize_session=False)
+        if count:
+            cache.bump_version(db)
+        db.commit()
+        deleted += count
+        if count < chunk_size:
+            return deleted
+
+
+def archive_transactions(db, start_ts=None, end_ts=None):
+    """
+    Write transactions in [start_ts, end_ts) to a Parquet file, paging by id.
+    Returns (path, rows_archived, max_id); path is None when nothing matched.
+    """
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(
+        ARCHIVE_DIR,
+        f"transactions_{start_ts or 'min'}_{end_ts or 'max'}_{datetime.now():%Y%m%d%H%M%S}.parquet"
+    )
+
+    writer = None
+    rows_archived = 0
+    last_id = None
+    try:
+        for batch in iter_record_batches(db, range_filter(start_ts, end_ts), ARCHIVE_CHUNK_SIZE):
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_batch(batch)
+            rows_archived += batch.num_rows
+            last_id = batch.column(0)[-1].as_py()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return (path if rows_archived else None), rows_archived, last_id
+
+
+def purge_transactions(db, start_ts=None, end_ts=None, archive=False):
+    """
+    Optionally archive, then chunk-delete a range. Only rows that made it into
+    the archive are deleted, so rows inserted meanwhile are never lost.
+    """
+    result = {"archive_path": None, "archived": 0}
+    max_id = None
+    if archive:
+        path, archived, max_id = archive_transactions(db, start_ts, end_ts)
+        result.update(archive_path=path, archived=archived)
+        if not archived:
+            result["deleted"] = 0
+            return result
+
+    result["deleted"] = delete_transactions(db, start_ts, end_ts, max_id)
+    if result["deleted"]:
+        rebuild_registry(db)
+        rebuild_rollup(db)
+    return result
+
+
+def apply_retention(db, keep_months=RETENTION_MONTHS, archive=False, today=None):
+    """
+    Drop (and optionally archive) everything older than keep_months
+    """
+    cutoff = (today or date.today()) - relativedelta(months=keep_months)
+    result = purge_transactions(db, end_ts=day_start_timestamp(cutoff), archive=archive)
+    result["cutoff"] = cutoff.isoformat()
+    return result
+
+
+def compact(pages=None, switch_mode=False):
+    """
+    Return free pages to the filesystem with an incremental vacuum of at most
+    `pages` pages (all free pages if None), which only holds the write lock
+    briefly.
+
+    A database created before incremental auto-vacuum was enabled needs a
+    one-off full VACUUM to switch modes. That rewrites the whole file, so it
+    only runs with switch_mode=True (the compact endpoint and startup);
+    otherwise nothing is freed and "incremental" is False in the result.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        freelist_before = conn.execute(text("PRAGMA freelist_count")).scalar()
+        incremental = conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2
+        full_vacuum = not incremental and switch_mode
+        if full_vacuum:
+            conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+        elif incremental:
+            # sqlite3's execute() stops after the first page; executescript() runs it to completion
+            cursor = conn.connection.cursor()
+            cursor.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)});")
+            cursor.close()
+        freelist_after = conn.execute(text("PRAGMA freelist_count")).scalar()
+
+    return {
+        "full_vacuum": full_vacuum,
+        "incremental": incremental or full_vacuum,
+        "pages_freed": freelist_before - freelist_after,
+        "free_pages_remaining": freelist_after,
+    }
@@ -0,0 +1,263 @@
+import re
+import threading
+from difflib import SequenceMatcher
+from itertools import chain
+import cache
+from models import Merchant, MerchantAlias, Transaction
+
+# Keys with the same words except one that is at least this similar (difflib
+# ratio) to its counterpart, a typo, are one merchant. Words shorter than
+# TYPO_MIN_CHARS must match exactly ("transfer to" is not "transfer from").
+FUZZY_THRESHOLD = 0.85
+TYPO_MIN_CHARS = 4
+# Candidates for fuzzy matching share this many leading characters of the key
+BLOCK_CHARS = 4
+# Values per "IN (...)" lookup, under SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+# Card processor and point-of-sale prefixes: "SQ *BLUE BOTTLE", "TST* PIZZA", "POS DEBIT ..."
+_PREFIX = re.compile(r"^(?:(?:sq|tst|sp|pp|paypal|pos|dd|ic|in|py)\s*\*\s*|(?:pos|debit)\s+)+")
+_DOMAIN = re.compile(r"\.(?:com|net|org|co|io)\b")
+# Store, reference and phone numbers, dates and times. Short numbers that are
+# part of a name ("Forever 21", "76 Gas Station", "Gym 2") are kept.
+_NUMBERS = re.compile(
+    r"\(?\b\d{3}\)?[\s.\-]\d{3}[\s.\-]\d{4}\b"   # phone numbers
+    r"|\b\d{1,4}[/\-.]\d{1,2}(?:[/\-.]\d{2,4})?\b"  # dates
+    r"|\b\d{1,2}:\d{2}(?::\d{2})?\b"                # times
+    r"|#\s*\d+"                                     # store numbers: "#4432"
+    r"|\*\s*[a-z0-9]*\d[a-z0-9]*"                   # card references: "*2K4LM1"
+    r"|\d{4,}"                                      # long reference numbers
+)
+_PUNCTUATION = re.compile(r"[^a-z0-9&+ ]+")
+_NOISE_WORDS = {"inc", "llc", "ltd", "co", "corp", "corporation", "company", "www", "the", "payment"}
+
+# In-process lookup tables. They are hints: ids are assigned by SQLite,
+# misses fall back to the tables, and cached ids are checked against the
+# merchants table before use, so other processes' writes and clears are seen.
+_lock = threading.Lock()
+_aliases = None   # raw descriptor -> (merchant id, name)
+_keys = None      # key -> (merchant id, name)
+_ids = None       # merchant id -> key
+_blocks = None    # key[:BLOCK_CHARS] -> [key, ...]
+
+def merchant_key(raw):
+    """
+    Normalized descriptor: lowercase, without processor prefixes, domains,
+    store/phone/reference numbers, dates, punctuation and corporate suffixes.
+    "NETFLIX.COM 866-579-7172", "Netflix Inc" and "netflix" all give "netflix".
+    """
+    key = _PREFIX.sub("", raw.lower().strip())
+    key = _DOMAIN.sub(" ", key)
+    key = _NUMBERS.sub(" ", key)
+    key = _PUNCTUATION.sub(" ", key)
+    words = [w for w in key.split() if w not in _NOISE_WORDS]
+    return " ".join(words) or raw.lower().strip()
+
+
+def _load(db):
+    global _aliases, _keys, _ids, _blocks
+    if _aliases is not None:
+        return
+    _aliases, _keys, _ids, _blocks = {}, {}, {}, {}
+    for merchant_id, key, name in db.query(Merchant.id, Merchant.key, Merchant.name):
+        _remember(merchant_id, key, name)
+    aliases = db.query(MerchantAlias.raw, Merchant.id, Merchant.name)\
+        .join(Merchant, MerchantAlias.merchant_id == Merchant.id)
+    for raw, merchant_id, name in aliases:
+        _aliases[raw] = (merchant_id, name)
+
+
+def _remember(merchant_id, key, name):
+    if key not in _keys:
+        _blocks.setdefault(key[:BLOCK_CHARS], []).append(key)
+    _keys[key] = (merchant_id, name)
+    _ids[merchant_id] = key
+
+
+def _drop():
+    global _aliases, _keys, _ids, _blocks
+    _aliases = _keys = _ids = _blocks = None
+
+
+def reset():
+    """Drop the in-process lookup tables; they reload from the database on next use"""
+    with _lock:
+        _drop()
+
+
+def _select_in(conn, sql, values):
+    """Rows of sql, whose "IN ({})" is filled with placeholders for values, a chunk at a time"""
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        yield from conn.exec_driver_sql(sql.format(", ".join("?" * len(chunk))), tuple(chunk))
+
+
+def _cache_is_current(conn, expected):
+    """True when each (merchant id, key) the cache used is still in the merchants table"""
+    ids = {merchant_id for merchant_id, _ in expected}
+    stored = dict(_select_in(conn, "SELECT id, key FROM merchants WHERE id IN ({})", ids))
+    return all(stored.get(merchant_id) == key for merchant_id, key in expected)
+
+
+def _read_aliases(conn, raws):
+    """Load the stored aliases of raws (and their merchants) into the cache"""
+    sql = ("SELECT merchant_aliases.raw, merchants.id, merchants.key, merchants.name "
+           "FROM merchant_aliases JOIN merchants ON merchants.id = merchant_aliases.merchant_id "
+           "WHERE merchant_aliases.raw IN ({})")
+    for raw, merchant_id, key, name in _select_in(conn, sql, raws):
+        _remember(merchant_id, key, name)
+        _aliases[raw] = (merchant_id, name)
+
+
+def _read_merchants(conn, keys):
+    """Load the stored merchants with these keys into the cache"""
+    for merchant_id, key, name in _select_in(conn, "SELECT id, key, name FROM merchants WHERE key IN ({})", keys):
+        _remember(merchant_id, key, name)
+
+
+def typo_ratio(key, candidate):
+    """
+    difflib ratio of the one differing word when two keys have the same words
+    apart from it, else 0. Words differing in anything but a typo, or in more
+    than one place, never match.
+    """
+    words, others = key.split(), candidate.split()
+    if len(words) != len(others):
+        return 0.0
+    differing = [(a, b) for a, b in zip(words, others) if a != b]
+    if len(differing) != 1:
+        return 0.0
+    a, b = differing[0]
+    if max(len(a), len(b)) < TYPO_MIN_CHARS:
+        return 0.0
+    # ratio can be at most 2 * shorter / total length; skip what cannot reach the threshold
+    if 2 * min(len(a), len(b)) / (len(a) + len(b)) < FUZZY_THRESHOLD:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.quick_ratio() < FUZZY_THRESHOLD:
+        return 0.0
+    return matcher.ratio()
+
+
+def _fuzzy_match(key, pending):
+    """Closest known or pending (block -> [key, ...]) key that key is a typo of, or None"""
+    block = key[:BLOCK_CHARS]
+    best, best_ratio = None, FUZZY_THRESHOLD
+    for candidate in chain(_blocks.get(block, ()), pending.get(block, ())):
+        # A typo changes the key length by a couple of characters at most
+        if abs(len(key) - len(candidate)) > 2:
+            continue
+        ratio = typo_ratio(key, candidate)
+        if ratio >= best_ratio:
+            best, best_ratio = candidate, ratio
+    return best
+
+
+def _plan(conn, uniques, counts):
+    """
+    ({descriptor: key} for descriptors without an alias, {key: name} of the
+    merchants to create), reading aliases and merchants missing from the cache
+    """
+    _read_aliases(conn, [value for value in uniques if value not in _aliases])
+    unknown = [i for i, value in enumerate(uniques) if value not in _aliases]
+    keys = {i: merchant_key(uniques[i]) for i in unknown}
+    _read_merchants(conn, {key for key in keys.values() if key not in _keys})
+
+    # Most frequent descriptors first, so they name the merchants they create
+    targets, new_merchants, pending = {}, {}, {}
+    for i in sorted(unknown, key=lambda i: -counts[i]):
+        key = keys[i]
+        if key not in _keys and key not in new_merchants:
+            match = _fuzzy_match(key, pending)
+            if match is None:
+                new_merchants[key] = uniques[i]
+                pending.setdefault(key[:BLOCK_CHARS], []).append(key)
+            else:
+                key = match
+        targets[uniques[i]] = key
+    return targets, new_merchants
+
+
+def resolve_merchants(db, raw):
+    """
+    Canonical (merchant ids, names) for a Series of raw descriptors, as numpy
+    arrays aligned with it. Each distinct descriptor is resolved once: first
+    through the alias table, then by exact normalized key, then by fuzzy
+    match within its key block; what is still unknown becomes a new
+    merchant. New merchants and aliases are added without committing, so
+    call this inside the ingest transaction; if that rolls back, call reset().
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(raw, sort=False)
+    counts = np.bincount(codes, minlength=len(uniques)) if len(codes) else np.zeros(0, dtype=int)
+    conn = db.connection()
+
+    with _lock:
+        _load(db)
+        # Taken before _plan reads rows that may replace stale entries
+        expected = {(_aliases[value][0], _ids[_aliases[value][0]]) for value in uniques if value in _aliases}
+        targets, new_merchants = _plan(conn, uniques, counts)
+        expected |= {(_keys[key][0], key) for key in targets.values() if key not in new_merchants}
+        if expected and not _cache_is_current(conn, expected):
+            # Merchants were cleared or rebuilt by another process
+            _drop()
+            _load(db)
+            targets, new_merchants = _plan(conn, uniques, counts)
+
+        if new_merchants:
+            # Another process may have added the same key meanwhile; either way read the ids back
+            conn.exec_driver_sql(
+                "INSERT INTO merchants (key, name) VALUES (?, ?) ON CONFLICT (key) DO NOTHING",
+                list(new_merchants.items())
+            )
+            _read_merchants(conn, new_merchants)
+        if targets:
+            conn.exec_driver_sql(
+                "INSERT INTO merchant_aliases (raw, merchant_id) VALUES (?, ?) ON CONFLICT (raw) DO NOTHING",
+                [(value, _keys[key][0]) for value, key in targets.items()]
+            )
+            _read_aliases(conn, targets)
+
+        resolved = [_aliases[value] for value in uniques]
+
+    ids = np.array([r[0] for r in resolved], dtype=np.int64)
+    names = np.array([r[1] for r in resolved], dtype=object)
+    return ids[codes], names[codes]
+
+
+def backfill_merchant_ids(db):
+    """
+    Resolve transactions stored before merchant normalization (merchant_id
+    NULL). Returns how many were updated; commits.
+    """
+    import pandas as pd
+
+    raw = [r for (r,) in db.query(Transaction.merchant).filter(Transaction.merchant_id.is_(None)).distinct()]
+    if not raw:
+        return 0
+    try:
+        resolve_merchants(db, pd.Series(raw))
+        updated = db.connection().exec_driver_sql(
+            "UPDATE transactions SET merchant_id = merchant_aliases.merchant_id "
+            "FROM merchant_aliases "
+            "WHERE transactions.merchant = merchant_aliases.raw AND transactions.merchant_id IS NULL"
+        ).rowcount
+        cache.bump_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        reset()
+        raise
+    return updated
+
+
+def clear_merchants(db):
+    """Forget every merchant and alias (after all transactions are deleted). Commits."""
+    db.query(MerchantAlias).delete()
+    db.query(Merchant).delete()
+    cache.bump_version(db)
+    db.commit()
+    reset()
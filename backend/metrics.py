@@ -0,0 +1,182 @@
+import bisect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# METRICS=0 turns stage timers into no-ops
+ENABLED = os.getenv("METRICS", "1") != "0"
+PROFILE_HEADER = "x-profile"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage breakdown of the request being profiled, if any
+_profile = ContextVar("profile", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(snapshot):
+            label_text = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            label_text = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+
+request_latency = Histogram(
+    "financial_coach_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+stage_latency = Histogram(
+    "financial_coach_stage_duration_seconds", "Analytics pipeline stage latency", ("stage",))
+stage_rows = Counter(
+    "financial_coach_stage_rows_total", "Rows processed per pipeline stage", ("stage",))
+peak_memory = Histogram(
+    "financial_coach_request_peak_memory_bytes", "Peak traced memory of profiled requests", ("route",),
+    buckets=tuple(2 ** n for n in range(20, 34)))
+
+
+class Stage:
+    __slots__ = ("name", "rows", "seconds")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Time a block of the analytics pipeline. Set .rows on the yielded object
+    (or pass rows=) to record how many rows the stage handled.
+    """
+    record = Stage(name, rows)
+    if not ENABLED:
+        yield record
+        return
+
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - started
+        stage_latency.observe((name,), record.seconds)
+        if record.rows is not None:
+            stage_rows.inc((name,), record.rows)
+        profile = _profile.get()
+        if profile is not None:
+            profile.append(record)
+
+
+_tracing = 0
+_tracing_lock = threading.Lock()
+
+
+def start_profile(trace_memory=False):
+    """
+    Begin collecting a stage breakdown for the current request.
+
+    With trace_memory, tracemalloc runs while the request is in flight. It
+    slows allocation-heavy code several times over, and the peak it reports is
+    process-wide, so concurrent requests are included in it.
+    """
+    global _tracing
+    if trace_memory:
+        with _tracing_lock:
+            if _tracing == 0:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            _tracing += 1
+    return _profile.set([]), trace_memory
+
+
+def finish_profile(token, total_seconds):
+    global _tracing
+    token, trace_memory = token
+    stages = _profile.get()
+    _profile.reset(token)
+    peak = None
+    if trace_memory:
+        with _tracing_lock:
+            _, peak = tracemalloc.get_traced_memory()
+            _tracing -= 1
+            if _tracing == 0:
+                tracemalloc.stop()
+
+    return {
+        "total_ms": round(total_seconds * 1000, 2),
+        "peak_memory_bytes": peak,
+        "stages": [
+            {"name": s.name, "ms": round(s.seconds * 1000, 2), "rows": s.rows}
+            for s in stages
+        ],
+    }
+
+
+def profile_headers(profile):
+    server_timing = ", ".join(
+        f'{s["name"]};dur={s["ms"]}' for s in profile["stages"]
+    )
+    return {
+        "Server-Timing": f"{server_timing}, total;dur={profile['total_ms']}".lstrip(", "),
+        "X-Profile": json.dumps(profile, separators=(",", ":")),
+    }
+
+
+def render():
+    lines = []
+    for metric in (request_latency, stage_latency, stage_rows, peak_memory):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,17 +1,40 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from constants import COMMON_MERCHANTS, MONTHLY_FIXED_EXPENSES
+from constants import COMMON_MERCHANTS, MONTHLY_FIXED_EXPENSES, VELOCITY_WINDOWS
+from metrics import stage
+from ml.velocity import add_velocity_features, normal_spend, velocity_feature_names
 
+# Velocity rules: at least BURST_COUNT charges at one merchant within
+# BURST_WINDOW making up BURST_SHARE of its activity over BASELINE_WINDOW, and
+# discretionary spend within SPIKE_WINDOW above SPIKE_FACTOR x the usual rate
+BURST_WINDOW = "1h"
+BURST_COUNT = 6
+BURST_SHARE = 0.5
+BASELINE_WINDOW = "7d"
+SPIKE_WINDOW = "24h"
+SPIKE_FACTOR = 5
 
-def transactions_to_dataframe(transactions, subscriptions=None):
-
-    df = pd.DataFrame([t.to_dict() for t in transactions])
 
-    df["date"] = pd.to_datetime(df["date"])
+def transactions_to_dataframe(transactions, subscriptions=None):
+    """
+    transactions: rows with id, timestamp, merchant_id, merchant (the
+    canonical name), amount and category, or a ledger frame that already
+    carries those plus date and month
+    """
+    if isinstance(transactions, pd.DataFrame):
+        df = transactions[["id", "timestamp", "merchant_id", "merchant", "amount", "category", "date"]].reset_index(drop=True)
+    else:
+        df = pd.DataFrame({
+            "id": [t.id for t in transactions],
+            "timestamp": [t.timestamp for t in transactions],
+            "merchant_id": [t.merchant_id for t in transactions],
+            "merchant": [t.merchant for t in transactions],
+            "amount": [t.amount for t in transactions],
+            "category": [t.category for t in transactions],
+        })
+
+        # Epoch seconds convert in one vectorized pass, keeping the time of day
+        df["date"] = pd.to_datetime(df["timestamp"], unit="s")
 
     df["hour_of_day"] = df["date"].dt.hour
     df["day_of_week"] = df["date"].dt.dayofweek
@@ -26,38 +49,49 @@ def transactions_to_dataframe(transactions, subscriptions=None):
                 "frequency_per_month": s.get("frequency_per_month", 1)
             }
 
-    df["is_subscription_merchant"] = df["merchant"].apply(
-        lambda m: 1 if m in subscription_lookup else 0
-    )
-    df["is_known_service"] = df["merchant"].apply(
-        lambda m: 1 if m in subscription_lookup and subscription_lookup[m]["is_known_service"] else 0
-    )
-    df["excessive_subscription_charges"] = df["merchant"].apply(
-        lambda m: 1 if m in subscription_lookup and subscription_lookup[m]["frequency_per_month"] > 1 else 0
-    )
-    df["is_common_merchant"] = df["merchant"].apply(
-        lambda m: 1 if any(common in m.lower() for common in COMMON_MERCHANTS) else 0
-    )
-    df["is_fixed_expense"] = df["merchant"].apply(
-        lambda m: 1 if any(fixed in m.lower() for fixed in MONTHLY_FIXED_EXPENSES) else 0
-    )
-    df = df.sort_values("date")
+    # The flags depend only on the merchant: work them out once per canonical
+    # merchant and broadcast back to the rows
+    codes, names = pd.factorize(df["merchant"])
+    flags = {
+        "is_subscription_merchant": [1 if m in subscription_lookup else 0 for m in names],
+        "is_known_service": [
+            1 if m in subscription_lookup and subscription_lookup[m]["is_known_service"] else 0 for m in names
+        ],
+        "excessive_subscription_charges": [
+            1 if m in subscription_lookup and subscription_lookup[m]["frequency_per_month"] > 1 else 0 for m in names
+        ],
+        "is_common_merchant": [1 if any(common in m.lower() for common in COMMON_MERCHANTS) else 0 for m in names],
+        "is_fixed_expense": [1 if any(fixed in m.lower() for fixed in MONTHLY_FIXED_EXPENSES) else 0 for m in names],
+    }
+    for column, values in flags.items():
+        df[column] = np.asarray(values, dtype=np.int64)[codes]
+    df = df.sort_values("timestamp", kind="stable")
     df["time_since_last"] = (
-        df.groupby("merchant")["date"].diff().dt.total_seconds().fillna(999999)
+        df.groupby("merchant_id")["timestamp"].diff().fillna(999999)
     )
-    df["time_since_any"] = df["date"].diff().dt.total_seconds().fillna(999999)
+    df["time_since_any"] = df["timestamp"].diff().fillna(999999)
+
+    discretionary = (
+        (df["is_fixed_expense"] == 0) & (df["is_subscription_merchant"] == 0)
+    ).to_numpy()
+    df = add_velocity_features(df, discretionary=discretionary)
+    df["discretionary"] = discretionary.astype(int)
 
     return df
 
 
 def build_anomaly_model():
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import OneHotEncoder
+    from sklearn.pipeline import Pipeline
+    from sklearn.compose import ColumnTransformer
 
     numeric_features = ["amount", "hour_of_day", "day_of_week",
                         "day_of_month", "is_subscription_merchant",
                         "is_known_service", "excessive_subscription_charges",
                         "is_fixed_expense",
-                        "time_since_last", "time_since_any"]
-    categorical_features = ["merchant", "category"]
+                        "time_since_last", "time_since_any"] + velocity_feature_names()
+    categorical_features = ["merchant_id", "category"]
 
     preprocessor = ColumnTransformer(
         transformers=[
@@ -126,11 +160,11 @@ def apply_rules(df):
     # Rule 5: Check for monthly fixed expenses appearing more than twice in same month
     # This catches rent/utilities being charged multiple times
     # Count occurrences per merchant per month
-    monthly_counts = df[df["is_fixed_expense"] == 1].groupby(["merchant", "month"]).size()
+    monthly_counts = df[df["is_fixed_expense"] == 1].groupby(["merchant_id", "month"]).size()
     excessive_fixed = df.apply(
         lambda row: (
             row["is_fixed_expense"] == 1 and
-            monthly_counts.get((row["merchant"], row["month"]), 0) > 2
+            monthly_counts.get((row["merchant_id"], row["month"]), 0) > 2
         ),
         axis=1
     )
@@ -141,6 +175,26 @@ def apply_rules(df):
     excessive_subscriptions = df["excessive_subscription_charges"] == 1
     rules.append(excessive_subscriptions)
 
+    # Rule 7: Bursts - many charges at one merchant within the hour that are
+    # most of its activity this week (busy regular merchants are not bursts)
+    # EXCLUDE known services and subscriptions
+    burst = (
+        (df[f"merchant_count_{BURST_WINDOW}"] >= BURST_COUNT) &
+        (df[f"merchant_count_{BURST_WINDOW}"] >= BURST_SHARE * df[f"merchant_count_{BASELINE_WINDOW}"]) &
+        (df["is_known_service"] == 0) &
+        (df["is_subscription_merchant"] == 0)
+    )
+    rules.append(burst)
+
+    # Rule 8: Discretionary spend over the last 24h far above the usual daily spend
+    # Fixed expenses and subscriptions neither count towards it nor get flagged
+    usual_spend = normal_spend(df, VELOCITY_WINDOWS[SPIKE_WINDOW], df["discretionary"] == 1)
+    spend_spike = (
+        (df[f"spend_{SPIKE_WINDOW}"] > SPIKE_FACTOR * usual_spend) &
+        (df["discretionary"] == 1)
+    )
+    rules.append(spend_spike)
+
     return pd.DataFrame({"rule_anomaly": np.any(rules, axis=0)})
 
 def detect_anomalies(transactions, subscriptions=None):
@@ -149,18 +203,22 @@ def detect_anomalies(transactions, subscriptions=None):
     Filters out common merchants and focuses on genuinely suspicious patterns.
     """
 
-    df = transactions_to_dataframe(transactions, subscriptions)
+    with stage("fraud.to_dataframe", rows=len(transactions)):
+        df = transactions_to_dataframe(transactions, subscriptions)
 
-    model = build_anomaly_model()
-    model.fit(df)
+    with stage("fraud.model_fit", rows=len(df)):
+        model = build_anomaly_model()
+        model.fit(df)
 
-    scores = model.named_steps["model"].score_samples(
-        model.named_steps["preprocess"].transform(df)
-    )
+    with stage("fraud.model_score", rows=len(df)):
+        scores = model.named_steps["model"].score_samples(
+            model.named_steps["preprocess"].transform(df)
+        )
 
     df["anomaly_score"] = scores
 
-    rule_results = apply_rules(df)
+    with stage("fraud.rules", rows=len(df)):
+        rule_results = apply_rules(df)
     df["rule_anomaly"] = rule_results["rule_anomaly"]
     df = df.sort_values("anomaly_score")
     ml_anomalies = df["anomaly_score"] < df["anomaly_score"].quantile(0.10)
@@ -1,29 +1,45 @@
-from prophet import Prophet
 import pandas as pd
+from metrics import stage
+
+def monthly_totals(transactions):
+    """
+    Sum of absolute amounts per month, as a frame of month start timestamps.
+    Accepts rows with timestamp/amount or a ledger frame with a month column.
+    """
+    if isinstance(transactions, pd.DataFrame):
+        df = pd.DataFrame({"month": transactions["month"], "amount": transactions["amount"].abs()})
+    else:
+        df = pd.DataFrame([{
+            "timestamp": t.timestamp,
+            "amount": abs(t.amount)
+        } for t in transactions])
+        df["month"] = pd.to_datetime(df["timestamp"], unit="s").dt.to_period("M")
+
+    monthly = df.groupby("month")["amount"].sum().reset_index()
+    monthly["month"] = monthly["month"].dt.to_timestamp()
+    return monthly
+
 
 def forecast(expenses, income_transactions):
+    # Prophet (and its Stan backend) takes seconds to import; only pay for it here
+    from prophet import Prophet
+
     result = {"history": [], "forecast": {}}
     monthly_data = {}
     
     if len(expenses) >= 2:
-        expense_df = pd.DataFrame([{
-            "date": t.date,
-            "amount": abs(t.amount)
-        } for t in expenses])
-
-        expense_df["date"] = pd.to_datetime(expense_df["date"])
-        expense_df["month"] = expense_df["date"].dt.to_period("M")
-        monthly_expenses = expense_df.groupby("month")["amount"].sum().reset_index()
-        monthly_expenses["month"] = monthly_expenses["month"].dt.to_timestamp()
+        monthly_expenses = monthly_totals(expenses)
 
         prophet_expense_df = monthly_expenses.rename(columns={"month": "ds", "amount": "y"})
         
         if len(prophet_expense_df) >= 2:  
-            expense_model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
-            expense_model.fit(prophet_expense_df)
+            with stage("forecast.expense_fit", rows=len(prophet_expense_df)):
+                expense_model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
+                expense_model.fit(prophet_expense_df)
 
-            future_expenses = expense_model.make_future_dataframe(periods=1, freq="MS")  # Changed from "M"
-            expense_forecast = expense_model.predict(future_expenses)
+            with stage("forecast.expense_predict"):
+                future_expenses = expense_model.make_future_dataframe(periods=1, freq="MS")  # Changed from "M"
+                expense_forecast = expense_model.predict(future_expenses)
 
             next_expense_pred = expense_forecast.tail(1).iloc[0]
 
@@ -40,24 +56,18 @@ def forecast(expenses, income_transactions):
 
     # Forecast income
     if len(income_transactions) >= 2:
-        income_df = pd.DataFrame([{
-            "date": t.date,
-            "amount": t.amount
-        } for t in income_transactions])
-
-        income_df["date"] = pd.to_datetime(income_df["date"])
-        income_df["month"] = income_df["date"].dt.to_period("M")
-        monthly_income = income_df.groupby("month")["amount"].sum().reset_index()
-        monthly_income["month"] = monthly_income["month"].dt.to_timestamp()
+        monthly_income = monthly_totals(income_transactions)
 
         prophet_income_df = monthly_income.rename(columns={"month": "ds", "amount": "y"})
         
         if len(prophet_income_df) >= 2:  
-            income_model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
-            income_model.fit(prophet_income_df)
+            with stage("forecast.income_fit", rows=len(prophet_income_df)):
+                income_model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False)
+                income_model.fit(prophet_income_df)
 
-            future_income = income_model.make_future_dataframe(periods=1, freq="MS") 
-            income_forecast = income_model.predict(future_income)
+            with stage("forecast.income_predict"):
+                future_income = income_model.make_future_dataframe(periods=1, freq="MS") 
+                income_forecast = income_model.predict(future_income)
 
             next_income_pred = income_forecast.tail(1).iloc[0]
 
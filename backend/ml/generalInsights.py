@@ -1,11 +1,18 @@
 from fastapi import HTTPException
 import os
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
+from metrics import stage
 
 load_dotenv()
-def generalInsights(all_transactions):
+
+SYSTEM_PROMPT = "You are a supportive financial advisor. Return ONLY a valid JSON object with a 'feedback' array containing exactly 5 items. Be encouraging, respectful, and celebrate user's good financial habits while offering gentle suggestions."
+
+
+def feedback_request(all_transactions):
+    """
+    The locally computed summary and the chat messages asking for feedback on it
+    """
     expenses = [t for t in all_transactions if t.amount < 0]
     income = [t for t in all_transactions if t.amount > 0]
 
@@ -75,19 +82,37 @@ Return ONLY a JSON object with a "feedback" key containing an array of exactly 5
   ]
 }}"""
 
-    try:
+    summary = {
+        "total_income": round(total_income, 2),
+        "total_expenses": round(total_expenses, 2),
+        "net_income": round(total_income - total_expenses, 2),
+        "category_breakdown": {
+            category: round(data["total"], 2)
+            for category, data in category_spending.items()
+        }
+    }
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    return summary, messages
+
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",     
-            messages=[
-                {"role": "system", "content": "You are a supportive financial advisor. Return ONLY a valid JSON object with a 'feedback' array containing exactly 5 items. Be encouraging, respectful, and celebrate user's good financial habits while offering gentle suggestions."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1200,
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
+def generalInsights(all_transactions):
+    summary, messages = feedback_request(all_transactions)
+
+    try:
+        from openai import OpenAI
+
+        with stage("feedback.llm"):
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",     
+                messages=messages,
+                max_tokens=1200,
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
 
         feedback_text = response.choices[0].message.content
 
@@ -99,16 +124,21 @@ Return ONLY a JSON object with a "feedback" key containing an array of exactly 5
 
         return {
             "feedback": feedback_items,
-            "summary": {
-                "total_income": round(total_income, 2),
-                "total_expenses": round(total_expenses, 2),
-                "net_income": round(total_income - total_expenses, 2),
-                "category_breakdown": {
-                    category: round(data["total"], 2)
-                    for category, data in category_spending.items()
-                }
-            }
+            "summary": summary
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting feedback: {str(e)}")
+
+
+def stream_general_insights(summary, messages):
+    """
+    Server-sent event tuples: the summary at once, then each feedback item
+    as soon as it has been streamed
+    """
+    from ml.llm_stream import stream_items
+
+    yield "summary", summary
+    with stage("feedback.llm_stream"):
+        for event, data in stream_items(messages, "feedback", 5):
+            yield ("feedback" if event == "item" else event), data
@@ -0,0 +1,49 @@
+import threading
+import pandas as pd
+
+FRAME_COLUMNS = ["id", "timestamp", "merchant_id", "merchant", "amount", "category"]
+
+
+class Ledger:
+    """
+    Transactions loaded once, with the intermediates the analyses share:
+    a typed frame with datetime and month columns, the expense/income split,
+    and the raw rows for the modules that iterate over them.
+
+    `rows` are tuples with id, timestamp, date, merchant_id, merchant (the
+    canonical name), amount and category attributes, ordered by timestamp.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        frame = pd.DataFrame({
+            "id": [r.id for r in rows],
+            "timestamp": [r.timestamp for r in rows],
+            "merchant_id": [r.merchant_id for r in rows],
+            "merchant": [r.merchant for r in rows],
+            "amount": [r.amount for r in rows],
+            "category": [r.category for r in rows],
+        })
+        frame["amount"] = frame["amount"].astype(float)
+        frame["date"] = pd.to_datetime(frame["timestamp"].astype("int64"), unit="s")
+        frame["month"] = frame["date"].dt.to_period("M")
+        self.frame = frame
+
+        self.expenses = frame[frame["amount"] < 0]
+        self.income = frame[frame["amount"] > 0]
+        self.expense_rows = [r for r in rows if r.amount < 0]
+
+
+class LazyLedger:
+    """Load a ledger on first use, once, even when several threads ask for it"""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._ledger = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._ledger is None:
+                self._ledger = self._loader()
+            return self._ledger
@@ -0,0 +1,106 @@
+import json
+import os
+
+
+class ArrayItemParser:
+    """
+    Incrementally parse a streamed JSON object of the form {"<key>": [{...}, ...]}
+    and hand back each item of the array as soon as its closing brace arrives.
+
+    Only tracks string/escape state and nesting depth, so each chunk costs
+    O(len(chunk)); an item is decoded once, when it is complete.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None
+        self.array_depth = None
+        self.item_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Add text; returns the array items completed by it"""
+        self.buffer += chunk
+        items = []
+        for i in range(self.pos, len(self.buffer)):
+            c = self.buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_key = self.buffer[self.string_start:i]
+            elif c == '"':
+                self.in_string = True
+                self.string_start = i + 1
+            elif c in "{[":
+                if c == "[" and len(self.stack) == 1 and self.last_key == self.key and not self.done:
+                    self.array_depth = 2
+                elif c == "{" and self.array_depth is not None and len(self.stack) == self.array_depth:
+                    self.item_start = i
+                self.stack.append(c)
+            elif c in "}]":
+                self.stack.pop()
+                if self.array_depth is None:
+                    continue
+                if c == "}" and len(self.stack) == self.array_depth and self.item_start is not None:
+                    items.append(json.loads(self.buffer[self.item_start:i + 1]))
+                    self.item_start = None
+                elif c == "]" and len(self.stack) == self.array_depth - 1:
+                    self.array_depth = None
+                    self.done = True
+        self.pos = len(self.buffer)
+        return items
+
+
+def stream_completion(messages, max_tokens=1200, temperature=0.7):
+    """
+    Yield the text deltas of a streamed gpt-4o-mini JSON completion.
+    OPENAI_BASE_URL, if set, points the client at another server.
+    """
+    from openai import OpenAI
+
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    stream = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def stream_items(messages, key, expected):
+    """
+    Yield ("item", item) for each element of the completion's `key` array as it
+    is parsed, then ("done", {"count": n}); ("error", {"detail": ...}) instead
+    when the request fails or the array does not have `expected` items.
+    """
+    parser = ArrayItemParser(key)
+    count = 0
+    try:
+        for delta in stream_completion(messages):
+            for item in parser.feed(delta):
+                count += 1
+                yield "item", item
+    except Exception as e:
+        yield "error", {"detail": f"Error getting feedback: {str(e)}"}
+        return
+
+    if count != expected:
+        yield "error", {"detail": f"Error getting feedback: Expected {expected} {key} items, got {count}"}
+        return
+    yield "done", {"count": count}
@@ -0,0 +1,117 @@
+import numpy as np
+from constants import UNCATEGORIZED
+from metrics import stage
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def monthly_history(monthly_data, subscriptions, charge_months, months=None):
+    """
+    Arrays to sample from: (income per month, variable spending per month and
+    category, category names, fixed monthly outflow).
+
+    monthly_data is the per-month breakdown ml.trends uses (see
+    rollup.monthly_breakdown), limited to the last `months` months.
+    Subscriptions charged during or since those months are taken out of their
+    category's spending in the months charge_months ({merchant: {"YYYY-MM":
+    charges}}) says they were charged, and returned as the fixed outflow
+    instead, so they are charged on every path rather than drawn. Ended
+    subscriptions, and any whose category has no spending in those months,
+    stay in the history as ordinary spending.
+    """
+    keys = sorted(monthly_data)[-months:] if months else sorted(monthly_data)
+    categories = sorted({c for key in keys for c in monthly_data[key]["categories"]})
+    column = {category: i for i, category in enumerate(categories)}
+
+    income = np.array([monthly_data[key]["income"] for key in keys], dtype=np.float64)
+    spending = np.zeros((len(keys), len(categories)))
+    for row, key in enumerate(keys):
+        for category, amount in monthly_data[key]["categories"].items():
+            spending[row, column[category]] = amount
+
+    row_of = {key: row for row, key in enumerate(keys)}
+    fixed = 0.0
+    for sub in subscriptions:
+        # The rollup books charges without a category as UNCATEGORIZED
+        category = sub.get("category") or UNCATEGORIZED
+        if not keys or sub["last_charged"][:7] < keys[0] or category not in column:
+            continue
+        cost = sub["estimated_monthly_cost"]
+        fixed += cost
+        for month, charges in charge_months.get(sub["merchant"], {}).items():
+            if month in row_of:
+                spending[row_of[month], column[category]] -= cost * charges
+    np.clip(spending, 0, None, out=spending)
+    return income, spending, categories, fixed
+
+
+def simulate(income, spending, fixed, horizon=6, paths=20000, balance=0.0, seed=0):
+    """
+    Bootstrap `paths` cash-flow paths over `horizon` months: each month draws
+    income, and each category's spending independently, from a random
+    historical month, then pays the fixed outflow.
+
+    Returns (balances, ever_negative): the running balance per path and month
+    (paths x horizon) and whether each path has gone below zero by each month.
+    All paths advance together one month at a time, so memory stays at
+    paths x categories however long the horizon.
+    """
+    rng = np.random.default_rng(seed)
+    history, n_categories = spending.shape
+    # Category c of month m sits at c * history + m
+    flat = spending.T.ravel()
+    offsets = np.arange(n_categories) * history
+
+    balances = np.empty((paths, horizon))
+    ever_negative = np.empty((paths, horizon), dtype=bool)
+    current = np.full(paths, float(balance))
+    negative = current < 0
+    for month in range(horizon):
+        drawn = rng.integers(0, history, size=(paths, n_categories))
+        spent = flat[drawn + offsets].sum(axis=1) if n_categories else np.zeros(paths)
+        earned = income[rng.integers(0, history, size=paths)]
+        current = current + earned - spent - fixed
+        negative |= current < 0
+        balances[:, month] = current
+        ever_negative[:, month] = negative
+    return balances, ever_negative
+
+
+def projection(monthly_data, subscriptions, charge_months, horizon=6, paths=20000, balance=0.0, history_months=12,
+               seed=0):
+    """
+    Probability of the balance going negative and balance/savings percentiles
+    over the next `horizon` months, from bootstrapped monthly cash flows
+    """
+    income, spending, categories, fixed = monthly_history(monthly_data, subscriptions, charge_months, history_months)
+    last = sorted(monthly_data)[-1]
+    year, month = int(last[:4]), int(last[5:7])
+    months = []
+    for _ in range(horizon):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        months.append(f"{year:04d}-{month:02d}")
+
+    with stage("projection.simulate", rows=paths * horizon):
+        balances, ever_negative = simulate(income, spending, fixed, horizon, paths, balance, seed)
+        balance_percentiles = np.percentile(balances, PERCENTILES, axis=0)
+        probability_negative = ever_negative.mean(axis=0)
+
+    return {
+        "months": months,
+        "paths": paths,
+        "history_months": len(income),
+        "starting_balance": round(float(balance), 2),
+        "fixed_monthly_outflow": round(fixed, 2),
+        "categories": categories,
+        "probability_negative": round(float(probability_negative[-1]), 4),
+        "probability_negative_by_month": [round(float(p), 4) for p in probability_negative],
+        "expected_savings": round(float(balances[:, -1].mean() - balance), 2),
+        "balance_percentiles": {
+            f"p{p}": [round(float(v), 2) for v in row]
+            for p, row in zip(PERCENTILES, balance_percentiles)
+        },
+        "savings_percentiles": {
+            f"p{p}": round(float(v - balance), 2)
+            for p, v in zip(PERCENTILES, balance_percentiles[:, -1])
+        },
+    }
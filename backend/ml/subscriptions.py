@@ -1,69 +1,103 @@
 import pandas as pd
 from constants import SUBSCRIPTION_KEYWORDS
 
+# Largest standard deviation / mean of a merchant's charges that still counts as one price
+MAX_AMOUNT_VARIATION = 0.25
+
+NOT_ENOUGH_DATA = {
+    "subscriptions": [],
+    "total_monthly_cost": 0.0,
+    "message": "Not enough data to detect recurring expenses"
+}
+
+
+def is_recurring(months_active, max_month_count, avg_amount, std_amount):
+    """
+    Charged in at least two months, never twice in one month, at a steady amount
+    """
+    if max_month_count > 1 or months_active < 2:
+        return False
+    if not pd.isna(std_amount) and avg_amount > 0:
+        if (std_amount / avg_amount) > MAX_AMOUNT_VARIATION:
+            return False
+    return True
+
+
+def subscription_entry(merchant, avg_amount, months_active, last_charged, category):
+    merchant_lower = merchant.lower()
+    is_known_service = bool(any(kw in merchant_lower for kw in SUBSCRIPTION_KEYWORDS))
+
+    return {
+        "merchant": merchant,
+        "average_amount": round(avg_amount, 2),
+        "months_active": int(months_active),
+        "frequency_per_month": 1.0,  #Once a month
+        "is_known_service": is_known_service,
+        "last_charged": last_charged,
+        "category": category,
+        "estimated_monthly_cost": round(avg_amount, 2)
+    }
+
+
+def summarize_subscriptions(subscriptions):
+    subscriptions.sort(key=lambda x: x["estimated_monthly_cost"], reverse=True)
+    total_monthly = sum(sub["estimated_monthly_cost"] for sub in subscriptions)
+
+    return {
+        "subscriptions": subscriptions,
+        "total_subscriptions": len(subscriptions),
+        "total_monthly_cost": round(total_monthly, 2),
+        "message": f"Found {len(subscriptions)} recurring expenses"
+    }
+
 
 def subscriptions(expenses):
+    """
+    Detect subscriptions from the full expense history. The API reads the
+    incrementally maintained registry instead (registry.py); this is the
+    from-scratch equivalent.
+
+    expenses: expense rows, or a ledger frame of expenses with merchant_id,
+    merchant, amount, category, date and month columns
+    """
     if len(expenses) < 2:
-        return {
-            "subscriptions": [],
-            "total_monthly_cost": 0.0,
-            "message": "Not enough data to detect recurring expenses"
-        }
-
-    df = pd.DataFrame([{
-        "merchant": t.merchant,
-        "amount": abs(t.amount),
-        "date": t.date,
-        "category": t.category
-    } for t in expenses])
-
-    df["date"] = pd.to_datetime(df["date"])
-    df["month"] = df["date"].dt.to_period("M")
+        return dict(NOT_ENOUGH_DATA)
+
+    if isinstance(expenses, pd.DataFrame):
+        df = expenses[["merchant_id", "merchant", "amount", "category", "date", "month"]].assign(
+            amount=expenses["amount"].abs()
+        ).reset_index(drop=True)
+    else:
+        df = pd.DataFrame([{
+            "merchant_id": t.merchant_id,
+            "merchant": t.merchant,
+            "amount": abs(t.amount),
+            "timestamp": t.timestamp,
+            "category": t.category
+        } for t in expenses])
+
+        df["date"] = pd.to_datetime(df["timestamp"], unit="s")
+        df["month"] = df["date"].dt.to_period("M")
 
     subscriptions = []
 
-    for merchant in df["merchant"].unique():
-        merchant_data = df[df["merchant"] == merchant]
+    for _, merchant_data in df.groupby("merchant_id", sort=False):
+        merchant = merchant_data["merchant"].iat[0]
 
         monthly_groups = merchant_data.groupby("month")
         transaction_counts_per_month = monthly_groups.size()
 
-        if (transaction_counts_per_month > 1).any():
-            continue
-
         months_active = len(transaction_counts_per_month)
-        if months_active < 2:
-            continue
-
         avg_amount = float(merchant_data["amount"].mean())
         std_amount = float(merchant_data["amount"].std())
 
-        if not pd.isna(std_amount) and avg_amount > 0:
-            if (std_amount / avg_amount) > 0.25:
-                continue
+        if not is_recurring(months_active, transaction_counts_per_month.max(), avg_amount, std_amount):
+            continue
 
         recent = merchant_data.sort_values("date", ascending=False).iloc[0]
+        subscriptions.append(subscription_entry(
+            merchant, avg_amount, months_active,
+            recent["date"].strftime("%Y-%m-%d"), recent["category"]
+        ))
 
-        merchant_lower = merchant.lower()
-        is_known_service = bool(any(kw in merchant_lower for kw in SUBSCRIPTION_KEYWORDS))
-
-        subscriptions.append({
-            "merchant": merchant,
-            "average_amount": round(avg_amount, 2),
-            "months_active": int(months_active),
-            "frequency_per_month": 1.0,  #Once a month
-            "is_known_service": is_known_service,
-            "last_charged": recent["date"].strftime("%Y-%m-%d"),
-            "category": recent["category"],
-            "estimated_monthly_cost": round(avg_amount, 2)
-        })
-
-    subscriptions.sort(key=lambda x: x["estimated_monthly_cost"], reverse=True)
-    total_monthly = sum(sub["estimated_monthly_cost"] for sub in subscriptions)
-
-    return {
-        "subscriptions": subscriptions,
-        "total_subscriptions": len(subscriptions),
-        "total_monthly_cost": round(total_monthly, 2),
-        "message": f"Found {len(subscriptions)} recurring expenses"
-    }
\ No newline at end of file
+    return summarize_subscriptions(subscriptions)
\ No newline at end of file
@@ -1,32 +1,24 @@
 from fastapi import HTTPException
 import os
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
+from metrics import stage
 from datetime import datetime
-from collections import defaultdict
 
 load_dotenv()
-def trends(all_transactions):
 
-    expenses = [t for t in all_transactions if t.amount < 0]
-    income = [t for t in all_transactions if t.amount > 0]
+SYSTEM_PROMPT = "You are a financial budgeting advisor. Return ONLY a valid JSON object with a 'budget_plan' array containing exactly 5 budget recommendations."
 
-    monthly_data = defaultdict(lambda: {
-        "income": 0,
-        "expenses": 0,
-        "categories": defaultdict(float)
-    })
 
-    for t in expenses:
-        month_key = t.date.strftime("%Y-%m")  
-        category = t.category or "Uncategorized"
-        monthly_data[month_key]["expenses"] += abs(t.amount)
-        monthly_data[month_key]["categories"][category] += abs(t.amount)
+def budget_request(monthly_data, category_spending):
+    """
+    The locally calculated trends and summary, and the chat messages asking
+    for a budget plan from them.
 
-    for t in income:
-        month_key = t.date.strftime("%Y-%m")
-        monthly_data[month_key]["income"] += t.amount
+    monthly_data: {"YYYY-MM": {"income", "expenses", "categories": {category: spent}}}
+    category_spending: {category: {"total", "count"}} over the same period
+    (see rollup.monthly_breakdown)
+    """
 
     sorted_months = sorted(monthly_data.keys())
     calculated_trends = []
@@ -99,32 +91,8 @@ def trends(all_transactions):
                 "average": round(avg_value, 2)
             })
 
-    category_spending = {}
-    for t in expenses:
-        category = t.category or "Uncategorized"
-        if category not in category_spending:
-            category_spending[category] = {
-                "total": 0,
-                "count": 0,
-                "transactions": []
-            }
-        category_spending[category]["total"] += abs(t.amount)
-        category_spending[category]["count"] += 1
-        category_spending[category]["transactions"].append({
-            "merchant": t.merchant,
-            "amount": abs(t.amount),
-            "date": t.date.isoformat()
-        })
-
-    total_income = sum(t.amount for t in income)
-    income_sources = {}
-    for t in income:
-        merchant = t.merchant or "Unknown Source"
-        if merchant not in income_sources:
-            income_sources[merchant] = 0
-        income_sources[merchant] += t.amount
-
-    total_expenses = sum(abs(t.amount) for t in expenses)
+    total_income = sum(monthly_data[m]["income"] for m in sorted_months)
+    total_expenses = sum(monthly_data[m]["expenses"] for m in sorted_months)
 
     monthly_summary = []
     for month in sorted_months:
@@ -145,10 +113,6 @@ def trends(all_transactions):
         percentage = (data["total"] / total_expenses * 100) if total_expenses > 0 else 0
         category_summary.append(f"- {category}: ${data['total']:.2f} ({percentage:.1f}% of spending, {data['count']} transactions)")
 
-    income_summary = []
-    for source, amount in income_sources.items():
-        income_summary.append(f"- {source}: ${amount:.2f}")
-
     trends_summary = []
     for trend in calculated_trends:
         trend_desc = f"{trend['category']}: {trend['trend']}"
@@ -192,19 +156,39 @@ Return ONLY a JSON object with a "budget_plan" key containing an array of exactl
   ]
 }}"""
 
-    try:
+    summary = {
+        "total_income": round(total_income, 2),
+        "total_expenses": round(total_expenses, 2),
+        "net_income": round(total_income - total_expenses, 2),
+        "avg_monthly_income": round(avg_monthly_income, 2),
+        "avg_monthly_expenses": round(avg_monthly_expenses, 2),
+        "category_breakdown": {
+            category: round(data["total"], 2)
+            for category, data in category_spending.items()
+        }
+    }
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    return calculated_trends, summary, messages
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a financial budgeting advisor. Return ONLY a valid JSON object with a 'budget_plan' array containing exactly 5 budget recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1200,
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
+
+def trends(monthly_data, category_spending):
+    calculated_trends, summary, messages = budget_request(monthly_data, category_spending)
+
+    try:
+        from openai import OpenAI
+
+        with stage("trends.llm"):
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                max_tokens=1200,
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
 
         budget_text = response.choices[0].message.content
 
@@ -216,18 +200,22 @@ Return ONLY a JSON object with a "budget_plan" key containing an array of exactl
         return {
             "calculated_trends": calculated_trends,
             "budget_plan": budget_items,
-            "summary": {
-                "total_income": round(total_income, 2),
-                "total_expenses": round(total_expenses, 2),
-                "net_income": round(total_income - total_expenses, 2),
-                "avg_monthly_income": round(avg_monthly_income, 2),
-                "avg_monthly_expenses": round(avg_monthly_expenses, 2),
-                "category_breakdown": {
-                    category: round(data["total"], 2)
-                    for category, data in category_spending.items()
-                }
-            }
+            "summary": summary
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting feedback: {str(e)}")
+
+
+def stream_trends(calculated_trends, summary, messages):
+    """
+    Server-sent event tuples: the calculated trends and summary at once, then
+    each budget item as soon as it has been streamed
+    """
+    from ml.llm_stream import stream_items
+
+    yield "calculated_trends", calculated_trends
+    yield "summary", summary
+    with stage("trends.llm_stream"):
+        for event, data in stream_items(messages, "budget_plan", 5):
+            yield ("budget_item" if event == "item" else event), data
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from constants import VELOCITY_WINDOWS
+
+
+def window_sums(timestamps, window, *values, groups=None):
+    """
+    For each transaction, the sum of each values array over the trailing
+    window (t - window, t]: itself and the earlier transactions, within its
+    group when groups (integer codes) are given. Pass ones to count.
+
+    timestamps must be ascending. Each window is a difference of two prefix
+    sums, with its start found by binary search, so one call is a single
+    vectorized pass. Groups are laid out end to end on one axis by offsetting
+    each group's times by code * span, which keeps windows from crossing groups.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if len(ts) == 0:
+        return tuple(np.zeros(0) for _ in values)
+
+    order = None
+    key = ts - ts[0]
+    if groups is not None:
+        order = np.argsort(groups, kind="stable")  # stays time-ordered within each group
+        span = int(ts[-1] - ts[0]) + window + 1
+        key = np.asarray(groups, dtype=np.int64)[order] * span + key[order]
+
+    start = np.searchsorted(key, key - window, side="right")
+    end = np.arange(1, len(key) + 1)
+
+    results = []
+    for v in values:
+        v = np.asarray(v, dtype=np.float64)
+        if order is not None:
+            v = v[order]
+        prefix = np.concatenate(([0.0], np.cumsum(v)))
+        sums = prefix[end] - prefix[start]
+        if order is not None:
+            unsorted = np.empty_like(sums)
+            unsorted[order] = sums
+            sums = unsorted
+        results.append(sums)
+    return tuple(results)
+
+
+def velocity_feature_names(windows=VELOCITY_WINDOWS):
+    return [
+        f"{prefix}_{name}"
+        for name in windows
+        for prefix in ("count", "spend", "merchant_count", "merchant_spend")
+    ]
+
+
+def add_velocity_features(df, windows=VELOCITY_WINDOWS, discretionary=None):
+    """
+    Add per-window transaction counts and spend, per merchant (merchant_id)
+    and overall.
+
+    df must be sorted by timestamp. The overall figures only count rows where
+    discretionary is true (default: all), so rent day is not a spending spike.
+    """
+    ts = df["timestamp"].to_numpy()
+    spend = df["amount"].abs().to_numpy(dtype=np.float64)
+    ones = np.ones(len(df))
+    included = ones if discretionary is None else np.asarray(discretionary, dtype=np.float64)
+    codes, _ = pd.factorize(df["merchant_id"])
+
+    for name, seconds in windows.items():
+        df[f"count_{name}"], df[f"spend_{name}"] = window_sums(ts, seconds, included, spend * included)
+        df[f"merchant_count_{name}"], df[f"merchant_spend_{name}"] = window_sums(
+            ts, seconds, ones, spend, groups=codes
+        )
+    return df
+
+
+def normal_spend(df, window, discretionary=None):
+    """
+    Average spend per window length over the span of the history
+    """
+    if df.empty:
+        return 0.0
+    included = df if discretionary is None else df[discretionary]
+    span = max(int(df["timestamp"].iloc[-1] - df["timestamp"].iloc[0]), window)
+    return float(included["amount"].abs().sum()) * window / span
@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy import (
+    Boolean, Column, Integer, String, Float, Date, DateTime, LargeBinary, ForeignKey, Text,
+    Index, UniqueConstraint,
+)
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from database import Base
 
 class Transaction(Base):
@@ -7,7 +11,11 @@ class Transaction(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False, index=True)
+    # Seconds since the epoch of the full transaction time (naive, as uploaded)
+    timestamp = Column(Integer, nullable=False, index=True)
     merchant = Column(String, nullable=False, index=True)
+    # Canonical merchant the raw descriptor above resolves to (see merchants.py)
+    merchant_id = Column(Integer, ForeignKey("merchants.id"), nullable=True, index=True)
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=True)
     category = Column(String, nullable=True)
@@ -18,9 +26,142 @@ class Transaction(Base):
         return {
             "id": self.id,
             "date": self.date.isoformat() if self.date else None,
+            "timestamp": self.timestamp,
             "merchant": self.merchant,
             "amount": self.amount,
             "description": self.description,
             "category": self.category,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+class Merchant(Base):
+    """
+    Canonical merchant: one per normalized descriptor key. name is the most
+    common raw descriptor of the batch that first saw it.
+    """
+    __tablename__ = "merchants"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, nullable=False, unique=True)
+    name = Column(String, nullable=False)
+
+
+class MerchantAlias(Base):
+    """Raw descriptor as uploaded -> canonical merchant"""
+    __tablename__ = "merchant_aliases"
+
+    id = Column(Integer, primary_key=True)
+    raw = Column(String, nullable=False, unique=True)
+    merchant_id = Column(Integer, ForeignKey("merchants.id"), nullable=False, index=True)
+
+
+class UploadJob(Base):
+    __tablename__ = "upload_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    stage = Column(String, nullable=False, default="queued")  # queued, parsing, ingesting, recomputing, done
+    rows_total = Column(Integer, nullable=True)
+    rows_skipped = Column(Integer, nullable=True)
+    transactions_added = Column(Integer, nullable=True)
+    total_amount = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+    # "host:pid" of the server process that claimed the job (see JobQueue._claim)
+    owner = Column(String, nullable=True)
+    # JSON [{filename, rows_total, rows_skipped, duplicates, transactions_added}], one per parsed file
+    file_results = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class UploadJobFile(Base):
+    """Raw upload bytes, kept until the job has ingested them so it can resume after a restart"""
+    __tablename__ = "upload_job_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("upload_jobs.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+
+
+class SubscriptionRegistry(Base):
+    """
+    Running expense statistics per canonical merchant, updated in the same transaction
+    as each ingest (see registry.py). Merchants charged once a month at a
+    steady amount are flagged as subscriptions.
+    """
+    __tablename__ = "subscription_registry"
+
+    id = Column(Integer, primary_key=True, index=True)
+    merchant = Column(String, nullable=False, unique=True, index=True)  # canonical name
+    merchant_id = Column(Integer, nullable=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+    # Welford running mean and sum of squared deviations of the charged amounts
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    month_counts = Column(Text, nullable=False, default="{}")  # JSON {"YYYY-MM": charges}
+    months_active = Column(Integer, nullable=False, default=0)
+    max_month_count = Column(Integer, nullable=False, default=0)
+    first_timestamp = Column(Integer, nullable=True)
+    last_timestamp = Column(Integer, nullable=True)
+    last_amount = Column(Float, nullable=True)
+    last_category = Column(String, nullable=True)
+    # Consecutive latest charges within PRICE_CHANGE_TOLERANCE of last_amount (subscriptions only)
+    price_streak = Column(Integer, nullable=False, default=0)
+    is_subscription = Column(Boolean, nullable=False, default=False, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SubscriptionEvent(Base):
+    __tablename__ = "subscription_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    merchant = Column(String, nullable=False, index=True)
+    event = Column(String, nullable=False)  # new_subscription, price_changed
+    previous_amount = Column(Float, nullable=True)
+    amount = Column(Float, nullable=False)
+    charged_at = Column(Integer, nullable=False)  # timestamp of the charge that triggered it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "merchant": self.merchant,
+            "event": self.event,
+            "previous_amount": self.previous_amount,
+            "amount": self.amount,
+            "charged_at": datetime.fromtimestamp(self.charged_at, timezone.utc).strftime("%Y-%m-%d"),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class DailyRollup(Base):
+    """
+    Per day, category and sign (-1 expenses, 1 income): the day's absolute
+    amount and transaction count, plus running totals of both over all days
+    up to it. A date range is the difference of two running totals per
+    category and sign (see rollup.py).
+    """
+    __tablename__ = "daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("category", "sign", "day"),
+        Index("ix_daily_rollup_sign_day", "sign", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Integer, nullable=False)  # days since 1970-01-01
+    category = Column(String, nullable=False)
+    sign = Column(Integer, nullable=False)
+    amount = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    cum_amount = Column(Float, nullable=False, default=0.0)
+    cum_count = Column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """Single-row counter bumped on every write to transactions; analytics ETags are derived from it"""
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,185 @@
+import json
+import math
+from datetime import datetime, timezone
+from sqlalchemy import func
+import cache
+from models import Merchant, SubscriptionEvent, SubscriptionRegistry, Transaction
+
+# Charges within this relative distance are the same price. A subscription
+# whose last STEADY_PRICE_CHARGES charges shared a price changed price when the
+# next charge falls outside it; bills that vary every month never qualify.
+PRICE_CHANGE_TOLERANCE = 0.01
+STEADY_PRICE_CHARGES = 2
+
+
+def _charge_date(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _std(entry):
+    return math.sqrt(entry.m2 / (entry.count - 1)) if entry.count > 1 else float("nan")
+
+
+def update_registry(db, frame, emit_events=True):
+    """
+    Fold a batch of new transactions (timestamp, merchant_id, merchant,
+    amount, category columns, merchant being the canonical name) into the
+    registry, one entry per merchant_id. Call it inside the transaction that inserts
+    them so the two never drift apart; nothing is committed here.
+
+    Batch statistics are merged into the running ones with the pairwise form
+    of Welford's update, so each merchant costs O(1) however long its history.
+    Returns the SubscriptionEvents added to the session.
+    """
+    import pandas as pd
+    from ml.subscriptions import is_recurring
+
+    expenses = frame.loc[frame["amount"] < 0, ["timestamp", "merchant_id", "merchant", "amount", "category"]]
+    if expenses.empty:
+        return []
+
+    expenses = expenses.assign(amount=expenses["amount"].abs()).sort_values("timestamp", kind="stable")
+    expenses["month"] = pd.to_datetime(expenses["timestamp"], unit="s").dt.to_period("M")
+
+    grouped = expenses.groupby("merchant_id", sort=False)
+    batch = grouped["amount"].agg(["count", "mean"])
+    batch["m2"] = grouped["amount"].var(ddof=0) * batch["count"]
+    batch["first_timestamp"] = grouped["timestamp"].min()
+    last = expenses.drop_duplicates("merchant_id", keep="last").set_index("merchant_id")
+    batch = batch.join(last[["merchant", "timestamp", "amount", "category"]].add_prefix("last_"))
+
+    month_counts = {}
+    for (merchant_id, month), n in expenses.groupby(["merchant_id", "month"], sort=False).size().items():
+        month_counts.setdefault(merchant_id, {})[str(month)] = int(n)
+
+    positions = grouped.indices
+    existing = {entry.merchant_id: entry for entry in db.query(SubscriptionRegistry)}
+    events = []
+
+    for merchant_id, merchant, count, mean, m2, first_timestamp, last_timestamp, last_amount, last_category in zip(
+        batch.index, batch["last_merchant"], batch["count"], batch["mean"], batch["m2"],
+        batch["first_timestamp"], batch["last_timestamp"], batch["last_amount"], batch["last_category"]
+    ):
+        entry = existing.get(merchant_id)
+        if entry is None:
+            entry = SubscriptionRegistry(
+                merchant=merchant, merchant_id=int(merchant_id), count=0, mean=0.0, m2=0.0, month_counts="{}"
+            )
+            db.add(entry)
+        was_subscription = bool(entry.is_subscription)
+        previous_timestamp, previous_amount = entry.last_timestamp, entry.last_amount
+
+        total = entry.count + int(count)
+        delta = float(mean) - entry.mean
+        entry.m2 = entry.m2 + float(m2) + delta * delta * entry.count * int(count) / total
+        entry.mean = entry.mean + delta * int(count) / total
+        entry.count = total
+
+        months = json.loads(entry.month_counts)
+        for month, n in month_counts[merchant_id].items():
+            months[month] = months.get(month, 0) + n
+        entry.month_counts = json.dumps(months, sort_keys=True)
+        entry.months_active = len(months)
+        entry.max_month_count = max(months.values())
+
+        first_timestamp = int(first_timestamp)
+        if entry.first_timestamp is None or first_timestamp < entry.first_timestamp:
+            entry.first_timestamp = first_timestamp
+        if previous_timestamp is None or last_timestamp >= previous_timestamp:
+            entry.last_timestamp = int(last_timestamp)
+            entry.last_amount = float(last_amount)
+            entry.last_category = last_category if pd.notna(last_category) else None
+
+        entry.is_subscription = is_recurring(entry.months_active, entry.max_month_count, entry.mean, _std(entry))
+        if not entry.is_subscription:
+            entry.price_streak = 0
+            continue
+
+        # Walk this batch's new charges in time order, tracking the price streak
+        price, streak = (previous_amount, entry.price_streak) if was_subscription else (None, 0)
+        charges = expenses.iloc[positions[merchant_id]]
+        for timestamp, amount in zip(charges["timestamp"], charges["amount"]):
+            if was_subscription and timestamp <= previous_timestamp:
+                continue
+            amount = float(amount)
+            if price is not None and abs(amount - price) <= PRICE_CHANGE_TOLERANCE * price:
+                streak += 1
+            else:
+                if emit_events and was_subscription and streak >= STEADY_PRICE_CHARGES:
+                    events.append(SubscriptionEvent(
+                        merchant=merchant, event="price_changed", previous_amount=round(price, 2),
+                        amount=round(amount, 2), charged_at=int(timestamp)
+                    ))
+                streak = 1
+            price = amount
+        entry.price_streak = streak
+
+        if emit_events and not was_subscription:
+            events.append(SubscriptionEvent(
+                merchant=merchant, event="new_subscription",
+                amount=round(entry.mean, 2), charged_at=entry.last_timestamp
+            ))
+
+    db.add_all(events)
+    return events
+
+
+def rebuild_registry(db):
+    """
+    Recompute the registry from the remaining history, after deletes. Commits.
+    """
+    import pandas as pd
+
+    db.query(SubscriptionRegistry).delete()
+    rows = db.query(Transaction.timestamp, Transaction.merchant_id, Merchant.name, Transaction.amount, Transaction.category)\
+        .join(Merchant, Transaction.merchant_id == Merchant.id)\
+        .filter(Transaction.amount < 0)\
+        .order_by(Transaction.timestamp, Transaction.id)\
+        .all()
+    if rows:
+        frame = pd.DataFrame.from_records(rows, columns=["timestamp", "merchant_id", "merchant", "amount", "category"])
+        update_registry(db, frame, emit_events=False)
+    cache.bump_version(db)
+    db.commit()
+
+
+def registry_needs_rebuild(db):
+    """
+    True for a database that has expenses but no registry yet (created before
+    it existed), or a registry keyed by raw descriptor (from before merchant
+    normalization)
+    """
+    if db.query(SubscriptionRegistry.id).filter(SubscriptionRegistry.merchant_id.is_(None)).first() is not None:
+        return True
+    if db.query(SubscriptionRegistry.id).first() is not None:
+        return False
+    return db.query(Transaction.id).filter(Transaction.amount < 0).first() is not None
+
+
+def subscription_charge_months(db):
+    """{merchant: {"YYYY-MM": charges}} for the merchants flagged as subscriptions"""
+    entries = db.query(SubscriptionRegistry.merchant, SubscriptionRegistry.month_counts)\
+        .filter(SubscriptionRegistry.is_subscription)
+    return {merchant: json.loads(month_counts) for merchant, month_counts in entries}
+
+
+def registry_subscriptions(db):
+    """
+    Same result as ml.subscriptions.subscriptions() over the full history,
+    read from the registry
+    """
+    from ml.subscriptions import NOT_ENOUGH_DATA, subscription_entry, summarize_subscriptions
+
+    if db.query(func.coalesce(func.sum(SubscriptionRegistry.count), 0)).scalar() < 2:
+        return dict(NOT_ENOUGH_DATA)
+
+    entries = db.query(SubscriptionRegistry)\
+        .filter(SubscriptionRegistry.is_subscription)\
+        .order_by(SubscriptionRegistry.first_timestamp, SubscriptionRegistry.id)\
+        .all()
+    return summarize_subscriptions([
+        subscription_entry(
+            e.merchant, e.mean, e.months_active, _charge_date(e.last_timestamp), e.last_category
+        )
+        for e in entries
+    ])
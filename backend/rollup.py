@@ -0,0 +1,317 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import text
+import cache
+from constants import UNCATEGORIZED
+from models import DailyRollup, Transaction
+
+EXPENSE = -1
+INCOME = 1
+
+EPOCH = date(1970, 1, 1)
+# Day numbers standing in for an open-ended range
+FIRST_DAY = -10**7
+LAST_DAY = 10**7
+
+_ACCUMULATE = """
+UPDATE daily_rollup
+SET cum_amount = running.cum_amount, cum_count = running.cum_count
+FROM (
+    SELECT id,
+           SUM(amount) OVER (PARTITION BY category, sign ORDER BY day) AS cum_amount,
+           SUM(count) OVER (PARTITION BY category, sign ORDER BY day) AS cum_count
+    FROM daily_rollup
+) AS running
+WHERE daily_rollup.id = running.id
+"""
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def day_date(number):
+    return EPOCH + timedelta(days=number)
+
+
+def update_rollup(db, frame):
+    """
+    Add a batch of new transactions (timestamp, amount, category columns) to
+    the daily rollup and refresh the running totals. Call it inside the
+    transaction that inserts them; nothing is committed here.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if frame.empty:
+        return
+
+    daily = pd.DataFrame({
+        "category": frame["category"].fillna("").replace("", UNCATEGORIZED),
+        "sign": np.where(frame["amount"] < 0, EXPENSE, INCOME),
+        "day": frame["timestamp"] // 86400,
+        "amount": frame["amount"].abs(),
+    }).groupby(["category", "sign", "day"], sort=False)["amount"].agg(["sum", "size"]).reset_index()
+
+    conn = db.connection()
+    conn.exec_driver_sql(
+        "INSERT INTO daily_rollup (category, sign, day, amount, count, cum_amount, cum_count) "
+        "VALUES (?, ?, ?, ?, ?, 0, 0) "
+        "ON CONFLICT (category, sign, day) DO UPDATE SET "
+        "amount = amount + excluded.amount, count = count + excluded.count",
+        list(zip(
+            daily["category"].tolist(), daily["sign"].tolist(), daily["day"].tolist(),
+            daily["sum"].tolist(), daily["size"].tolist(),
+        ))
+    )
+    conn.exec_driver_sql(_ACCUMULATE)
+
+
+def rebuild_rollup(db):
+    """
+    Recompute the rollup from the remaining transactions, after deletes. Commits.
+    """
+    conn = db.connection()
+    conn.exec_driver_sql("DELETE FROM daily_rollup")
+    conn.exec_driver_sql(f"""
+        INSERT INTO daily_rollup (category, sign, day, amount, count, cum_amount, cum_count)
+        SELECT COALESCE(NULLIF(category, ''), '{UNCATEGORIZED}'),
+               CASE WHEN amount < 0 THEN {EXPENSE} ELSE {INCOME} END,
+               CAST(julianday(date) - 2440587.5 AS INTEGER),
+               SUM(ABS(amount)), COUNT(*), 0, 0
+        FROM transactions
+        GROUP BY 1, 2, 3
+    """)
+    conn.exec_driver_sql(_ACCUMULATE)
+    cache.bump_version(db)
+    db.commit()
+
+
+def rollup_needs_rebuild(db):
+    """True for a database that has transactions but no rollup yet (created before it existed)"""
+    if db.query(DailyRollup.id).first() is not None:
+        return False
+    return db.query(Transaction.id).first() is not None
+
+
+def period_totals(db, boundaries):
+    """
+    Amount and count per (category, sign) in each period between consecutive
+    boundary day numbers ([b0, b1), [b1, b2), ...). Each boundary is one
+    indexed lookup of the running total per category and sign, so the cost
+    does not depend on how many transactions the periods hold.
+    """
+    bounds = ", ".join(f"({i}, :b{i})" for i in range(len(boundaries)))
+    rows = db.execute(text(f"""
+        WITH bounds(i, day) AS (VALUES {bounds}),
+             series AS (SELECT DISTINCT category, sign FROM daily_rollup)
+        SELECT s.category, s.sign, b.i, r.cum_amount, r.cum_count
+        FROM series s CROSS JOIN bounds b
+        LEFT JOIN daily_rollup r ON r.id = (
+            SELECT id FROM daily_rollup
+            WHERE category = s.category AND sign = s.sign AND day < b.day
+            ORDER BY day DESC LIMIT 1
+        )
+    """), {f"b{i}": day for i, day in enumerate(boundaries)}).all()
+
+    running = defaultdict(lambda: [(0.0, 0)] * len(boundaries))
+    for category, sign, i, cum_amount, cum_count in rows:
+        running[(category, sign)][i] = (cum_amount or 0.0, cum_count or 0)
+
+    periods = []
+    for i in range(len(boundaries) - 1):
+        totals = {}
+        for series, values in running.items():
+            (amount_before, count_before), (amount_after, count_after) = values[i], values[i + 1]
+            if count_after > count_before:
+                totals[series] = (amount_after - amount_before, count_after - count_before)
+        periods.append(totals)
+    return periods
+
+
+def range_totals(db, start=None, end=None):
+    """Amount and count per (category, sign) dated between start and end, inclusive"""
+    first = day_number(start) if start else FIRST_DAY
+    last = day_number(end) + 1 if end else LAST_DAY
+    return period_totals(db, [first, last])[0]
+
+
+def data_days(db, start=None, end=None, sign=None):
+    """First and last day number with transactions in the range (None, None if there are none)"""
+    query = "SELECT MIN(day), MAX(day) FROM daily_rollup WHERE day BETWEEN :first AND :last"
+    params = {
+        "first": day_number(start) if start else FIRST_DAY,
+        "last": day_number(end) if end else LAST_DAY,
+    }
+    if sign is not None:
+        query += " AND sign = :sign"
+        params["sign"] = sign
+    return tuple(db.execute(text(query), params).one())
+
+
+def complete_months(db):
+    """
+    (start, end) dates spanning the whole calendar months with data, leaving
+    out a first or last month the history only partly covers; (None, None)
+    when there is no whole month
+    """
+    first, last = data_days(db)
+    if first is None:
+        return None, None
+    start, end = day_date(first), day_date(last)
+    if start.day != 1:
+        start = (start + timedelta(days=32)).replace(day=1)
+    if (end + timedelta(days=1)).day != 1:
+        end = end.replace(day=1) - timedelta(days=1)
+    if start > end:
+        return None, None
+    return start, end
+
+
+def summary(db, start=None, end=None):
+    """
+    Summary statistics focusing on expenses (negative amounts)
+    """
+    totals = range_totals(db, start, end)
+    expense_count = sum(count for (_, sign), (_, count) in totals.items() if sign == EXPENSE)
+    total_expenses = sum(amount for (_, sign), (amount, _) in totals.items() if sign == EXPENSE)
+    total_income = sum(amount for (_, sign), (amount, _) in totals.items() if sign == INCOME)
+
+    if not expense_count:
+        return {
+            "total_transactions": 0,
+            "total_expenses": 0.0,
+            "total_income": total_income,
+            "average_expense": 0.0,
+            "date_range": None
+        }
+
+    first, last = data_days(db, start, end, EXPENSE)
+    return {
+        "total_transactions": expense_count,
+        "total_expenses": round(total_expenses, 2),
+        "total_income": round(total_income, 2),
+        "average_expense": round(total_expenses / expense_count, 2),
+        "date_range": {
+            "start": day_date(first).isoformat(),
+            "end": day_date(last).isoformat()
+        }
+    }
+
+
+def category_breakdown(db, start=None, end=None):
+    """
+    Expense total, count and share per category, largest first
+    """
+    totals = range_totals(db, start, end)
+    expenses = [(category, amount, count) for (category, sign), (amount, count) in totals.items() if sign == EXPENSE]
+    total_expenses = sum(amount for _, amount, _ in expenses)
+    total_income = sum(amount for (_, sign), (amount, _) in totals.items() if sign == INCOME)
+
+    return {
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "total_expenses": round(total_expenses, 2),
+        "total_income": round(total_income, 2),
+        "categories": [
+            {
+                "category": category,
+                "total": round(amount, 2),
+                "count": count,
+                "share": round(amount / total_expenses * 100, 1) if total_expenses > 0 else 0.0
+            }
+            for category, amount, count in sorted(expenses, key=lambda x: x[1], reverse=True)
+        ]
+    }
+
+
+def _period(totals, first, last):
+    categories = {category: amount for (category, sign), (amount, _) in totals.items() if sign == EXPENSE}
+    return {
+        "start": day_date(first).isoformat(),
+        "end": day_date(last).isoformat(),
+        "total_expenses": round(sum(categories.values()), 2),
+        "total_income": round(sum(amount for (_, sign), (amount, _) in totals.items() if sign == INCOME), 2),
+        "transactions": sum(count for _, count in totals.values()),
+        "categories": categories,
+    }
+
+
+def _change(current, previous):
+    return {
+        "change": round(current - previous, 2),
+        "change_pct": round((current - previous) / previous * 100, 1) if previous else None,
+    }
+
+
+def compare_periods(db, days=30, end=None):
+    """
+    The `days` days ending at end (default: the last day with data) against
+    the `days` days before them, overall and per expense category
+    """
+    last = day_number(end) if end else data_days(db)[1]
+    if last is None:
+        return None
+
+    start = last - days + 1
+    previous_totals, current_totals = period_totals(db, [start - days, start, last + 1])
+    current = _period(current_totals, start, last)
+    previous = _period(previous_totals, start - days, start - 1)
+
+    categories = sorted(set(current["categories"]) | set(previous["categories"]))
+    rows = []
+    for category in categories:
+        now, before = current["categories"].get(category, 0.0), previous["categories"].get(category, 0.0)
+        rows.append({"category": category, "current": round(now, 2), "previous": round(before, 2), **_change(now, before)})
+    rows.sort(key=lambda row: abs(row["change"]), reverse=True)
+
+    for period in (current, previous):
+        period["categories"] = {category: round(amount, 2) for category, amount in period["categories"].items()}
+
+    return {
+        "days": days,
+        "current": current,
+        "previous": previous,
+        "total_expenses": _change(current["total_expenses"], previous["total_expenses"]),
+        "total_income": _change(current["total_income"], previous["total_income"]),
+        "categories": rows,
+    }
+
+
+def monthly_breakdown(db, start=None, end=None):
+    """
+    The per-month and per-category aggregates ml.trends works from:
+    (monthly_data, category_spending), limited to start..end
+    """
+    first, last = data_days(db, start, end)
+    if first is None:
+        return {}, {}
+
+    month_starts = []
+    month = day_date(first).replace(day=1)
+    while day_number(month) <= last:
+        month_starts.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    boundaries = [first] + [day_number(m) for m in month_starts[1:]] + [last + 1]
+
+    monthly_data = {}
+    for month, totals in zip(month_starts, period_totals(db, boundaries)):
+        categories = defaultdict(float)
+        income = expenses = 0.0
+        for (category, sign), (amount, _) in totals.items():
+            if sign == EXPENSE:
+                categories[category] += amount
+                expenses += amount
+            else:
+                income += amount
+        if categories or income > 0:
+            monthly_data[month.strftime("%Y-%m")] = {
+                "income": income, "expenses": expenses, "categories": categories
+            }
+
+    category_spending = {
+        category: {"total": amount, "count": count}
+        for (category, sign), (amount, count) in range_totals(db, start, end).items()
+        if sign == EXPENSE
+    }
+    return monthly_data, category_spending
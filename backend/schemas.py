@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 class TransactionBase(BaseModel):
     date: date
@@ -19,7 +19,22 @@ class TransactionResponse(TransactionBase):
     class Config:
         from_attributes = True
 
-class UploadResponse(BaseModel):
-    message: str
+class FileResult(BaseModel):
+    filename: str
+    rows_total: int
+    rows_skipped: int
+    duplicates: int
     transactions_added: int
-    total_amount: float
+
+class JobResponse(BaseModel):
+    job_id: int
+    status: str
+    stage: str
+    rows_total: Optional[int] = None
+    rows_processed: Optional[int] = None
+    rows_skipped: Optional[int] = None
+    transactions_added: Optional[int] = None
+    total_amount: Optional[float] = None
+    error: Optional[str] = None
+    files: Optional[List[FileResult]] = None
+    message: str
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from categorize import rule_category
+from merchants import merchant_key
+
+
+@pytest.mark.parametrize("merchant, incoming, category", [
+    ("Security Deposit", False, None),
+    ("Chase Interest Paid", False, None),
+    ("Chase Interest Paid", True, "Income"),
+    ("Paycheck Deposit", True, "Income"),
+    ("Amazon Refund", True, "Shopping"),
+    ("Delta Dental", False, "Healthcare"),
+    ("Power Yoga", False, "Health & Fitness"),
+    ("Bar Harbor Bank", False, None),
+    ("Water Utility", False, "Utilities"),
+])
+def test_rule_category(merchant, incoming, category):
+    assert rule_category(merchant_key(merchant), incoming) == category
@@ -0,0 +1,104 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import merchants
+from database import Base
+from merchants import merchant_key, resolve_merchants, typo_ratio
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    merchants.reset()
+    yield session
+    session.close()
+    merchants.reset()
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Transfer to Savings", "Transfer from Savings"),
+    ("Delta Dental", "Delta Airlines"),
+    ("Joes Pizza", "Joes Pasta"),
+    ("Blue Bottle", "Blue Bottle Coffee"),
+    ("Payment to Chase", "Payment from Chase"),
+])
+def test_different_merchants_are_not_merged(a, b):
+    assert merchant_key(a) != merchant_key(b)
+    assert typo_ratio(merchant_key(a), merchant_key(b)) < merchants.FUZZY_THRESHOLD
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Blue Bottle Cafe", "Blue Botle Cafe"),
+    ("NETFLIX.COM", "Netflx Inc"),
+])
+def test_typos_within_a_word_are_merged(a, b):
+    assert typo_ratio(merchant_key(a), merchant_key(b)) >= merchants.FUZZY_THRESHOLD
+
+
+def test_descriptor_variants_share_a_key():
+    keys = {merchant_key(raw) for raw in ["NETFLIX.COM 866-579-7172", "SQ *NETFLIX", "Netflix Inc", "netflix"]}
+    assert keys == {"netflix"}
+
+
+def test_resolve_keeps_opposite_transfers_apart(db):
+    raw = pd.Series(["Transfer to Savings", "Transfer from Savings", "TRANSFER TO SAVINGS #12", "Blue Botle Cafe",
+                     "Blue Bottle Cafe", "Blue Bottle Cafe"])
+    ids, names = resolve_merchants(db, raw)
+    assert ids[0] == ids[2]
+    assert ids[0] != ids[1]
+    assert ids[3] == ids[4] == ids[5]
+    assert names[3] == "Blue Bottle Cafe"
+
+
+def test_stale_cache_falls_back_to_the_tables(db):
+    first, _ = resolve_merchants(db, pd.Series(["Netflix", "Spotify"]))
+    db.commit()
+    # Another process clears the merchants and ingests a different one, reusing the ids
+    db.connection().exec_driver_sql("DELETE FROM merchant_aliases")
+    db.connection().exec_driver_sql("DELETE FROM merchants")
+    db.connection().exec_driver_sql("INSERT INTO merchants (id, key, name) VALUES (?, 'hulu', 'Hulu')", (int(first[0]),))
+    db.commit()
+
+    ids, names = resolve_merchants(db, pd.Series(["Netflix", "Hulu"]))
+    stored = dict(db.connection().exec_driver_sql("SELECT key, id FROM merchants").fetchall())
+    assert list(ids) == [stored["netflix"], stored["hulu"]]
+    assert ids[0] != ids[1]
+    assert list(names) == ["Netflix", "Hulu"]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("76 Gas Station", "Gas Station"),
+    ("Gym 1", "Gym 2"),
+    ("Studio 54", "Studio 12"),
+    ("Forever 21", "Forever"),
+])
+def test_numbered_brands_stay_distinct(a, b):
+    assert merchant_key(a) != merchant_key(b)
+    assert typo_ratio(merchant_key(a), merchant_key(b)) < merchants.FUZZY_THRESHOLD
+
+
+@pytest.mark.parametrize("raw, key", [
+    ("Forever 21", "forever 21"),
+    ("3M Company", "3m"),
+    ("STARBUCKS #4432 SEATTLE", "starbucks seattle"),
+    ("AMZN Mktp US*2K4LM1AB2", "amzn mktp us"),
+    ("Shell Oil 57442139", "shell oil"),
+    ("UBER TRIP 12/03 866-576-1039", "uber trip"),
+])
+def test_only_reference_numbers_are_dropped(raw, key):
+    assert merchant_key(raw) == key
+
+
+def test_resolve_keeps_numbered_brands_apart(db):
+    ids, _ = resolve_merchants(db, pd.Series(["Gym 1", "GYM 1 #22", "Gym 2", "76 Gas Station", "Gas Station"]))
+    assert ids[0] == ids[1]
+    assert len({ids[0], ids[2], ids[3], ids[4]}) == 4
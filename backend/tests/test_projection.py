@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from constants import UNCATEGORIZED
+from ml.projection import monthly_history
+
+MONTHS = ["2025-01", "2025-02", "2025-03"]
+
+
+def history(categories):
+    return {month: {"income": 1000.0, "expenses": sum(categories.values()), "categories": dict(categories)}
+            for month in MONTHS}
+
+
+def subscription(category, last_charged="2025-03-05"):
+    return {"merchant": "Streamer", "category": category, "estimated_monthly_cost": 15.0,
+            "last_charged": last_charged}
+
+
+CHARGED = {"Streamer": {month: 1 for month in MONTHS}}
+
+
+@pytest.mark.parametrize("category", [None, UNCATEGORIZED])
+def test_uncategorized_subscription_is_counted_once(category):
+    _, spending, categories, fixed = monthly_history(history({UNCATEGORIZED: 40.0}), [subscription(category)], CHARGED)
+    assert fixed == 15.0
+    assert spending[:, categories.index(UNCATEGORIZED)].tolist() == [25.0, 25.0, 25.0]
+
+
+def test_subscription_without_a_category_column_is_not_fixed():
+    _, spending, _, fixed = monthly_history(history({"Shopping": 40.0}), [subscription("Entertainment")], CHARGED)
+    assert fixed == 0.0
+    assert spending.sum() == 120.0
+
+
+def test_subscription_is_subtracted_only_in_charged_months():
+    charged = {"Streamer": {"2025-02": 1, "2025-03": 1}}
+    _, spending, _, fixed = monthly_history(history({"Entertainment": 40.0}), [subscription("Entertainment")], charged)
+    assert fixed == 15.0
+    assert spending[:, 0].tolist() == [40.0, 25.0, 25.0]
+
+
+def test_ended_subscription_stays_in_history():
+    ended = subscription("Entertainment", last_charged="2024-11-05")
+    _, spending, _, fixed = monthly_history(history({"Entertainment": 40.0}), [ended], CHARGED)
+    assert fixed == 0.0
+    assert spending.sum() == 120.0
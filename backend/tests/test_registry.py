@@ -0,0 +1,67 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import merchants
+from database import Base
+from generate_transactions import generate
+from ingest import insert_transactions, prepare_transactions
+from maintenance import day_start_timestamp, purge_transactions
+from merchants import resolve_merchants
+from registry import rebuild_registry, update_registry
+
+COLUMNS = ["merchant_id", "merchant", "count", "mean", "m2", "month_counts", "months_active", "max_month_count",
+           "first_timestamp", "last_timestamp", "last_amount", "last_category", "price_streak", "is_subscription"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    merchants.reset()
+    yield session
+    session.close()
+    merchants.reset()
+
+
+def upload(db, df):
+    """The registry part of an upload job (jobs.JobQueue._ingest)"""
+    frame, _ = prepare_transactions(df)
+    frame["merchant_id"], names = resolve_merchants(db, frame["merchant"])
+    insert_transactions(db, frame)
+    update_registry(db, frame.assign(merchant=names))
+    db.commit()
+
+
+def registry(db):
+    rows = db.connection().exec_driver_sql(f"SELECT {', '.join(COLUMNS)} FROM subscription_registry").fetchall()
+    return pd.DataFrame.from_records(rows, columns=COLUMNS).sort_values("merchant_id", ignore_index=True)
+
+
+def assert_matches_rebuild(db):
+    incremental = registry(db)
+    rebuild_registry(db)
+    assert incremental["is_subscription"].sum() > 0
+    pd.testing.assert_frame_equal(incremental, registry(db), check_exact=False, rtol=1e-9)
+
+
+def test_incremental_registry_matches_rebuild(db):
+    history = generate(6000, seed=3, months=12)
+    quarter = history["date"].dt.quarter
+    for q in (1, 2, 3):
+        upload(db, history[quarter == q])
+    assert_matches_rebuild(db)
+
+    start, end = pd.Timestamp("2023-05-10").date(), pd.Timestamp("2023-06-20").date()
+    assert purge_transactions(db, day_start_timestamp(start), day_start_timestamp(end))["deleted"] > 0
+    upload(db, history[quarter == 4])
+    assert_matches_rebuild(db)
@@ -0,0 +1,71 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import merchants
+from database import Base
+from generate_transactions import generate
+from ingest import insert_transactions, prepare_transactions
+from maintenance import day_start_timestamp, purge_transactions
+from merchants import resolve_merchants
+from rollup import rebuild_rollup, update_rollup
+
+COLUMNS = ["category", "sign", "day", "amount", "count", "cum_amount", "cum_count"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    merchants.reset()
+    yield session
+    session.close()
+    merchants.reset()
+
+
+def upload(db, df):
+    """The rollup part of an upload job (jobs.JobQueue._ingest)"""
+    frame, _ = prepare_transactions(df)
+    frame["merchant_id"], _ = resolve_merchants(db, frame["merchant"])
+    insert_transactions(db, frame)
+    update_rollup(db, frame)
+    db.commit()
+
+
+def rollup(db):
+    rows = db.connection().exec_driver_sql(f"SELECT {', '.join(COLUMNS)} FROM daily_rollup").fetchall()
+    return pd.DataFrame.from_records(rows, columns=COLUMNS).sort_values(["category", "sign", "day"], ignore_index=True)
+
+
+def assert_matches_rebuild(db):
+    incremental = rollup(db)
+    rebuild_rollup(db)
+    assert len(incremental) > 0
+    pd.testing.assert_frame_equal(incremental, rollup(db), check_exact=False, rtol=1e-9)
+
+
+def test_incremental_rollup_matches_rebuild(db):
+    history = generate(6000, seed=3, months=12)
+    # Some rows without a category, which both paths book as Uncategorized
+    history.loc[history.index % 7 == 0, "category"] = None
+    quarter = history["date"].dt.quarter
+    for q in (1, 2, 3):
+        upload(db, history[quarter == q])
+    assert_matches_rebuild(db)
+
+    start, end = pd.Timestamp("2023-05-10").date(), pd.Timestamp("2023-06-20").date()
+    assert purge_transactions(db, day_start_timestamp(start), day_start_timestamp(end))["deleted"] > 0
+    # Two statements covering the same days, uploaded one after the other
+    last = history[quarter == 4]
+    upload(db, last.iloc[::2])
+    upload(db, last.iloc[1::2])
+    assert_matches_rebuild(db)
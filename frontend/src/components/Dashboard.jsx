@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { useSelector, useDispatch } from 'react-redux'
-import { fetchTransactions, fetchSummary, fetchForecast, deleteAllTransactions } from '../store/transactionsSlice'
+import { fetchTransactions, fetchDashboard, deleteAllTransactions } from '../store/transactionsSlice'
 import Table from './Table'
 import Trends from './Trends'
 import UnusualModal from './modals/UnusualModal'
@@ -17,14 +17,12 @@ function Dashboard({ uploadResult, onUploadMore }) {
 
   useEffect(() => {
     dispatch(fetchTransactions(true))
-    dispatch(fetchSummary())
-    dispatch(fetchForecast())
+    dispatch(fetchDashboard())
   }, [dispatch])
 
   const handleRefresh = () => {
     dispatch(fetchTransactions(true))
-    dispatch(fetchSummary())
-    dispatch(fetchForecast())
+    dispatch(fetchDashboard())
   }
 
 
@@ -3,7 +3,7 @@ import { useSelector, useDispatch } from 'react-redux'
 import { checkDataExists } from '../store/transactionsSlice'
 
 function Onboarding({ onComplete, onGoToDashboard }) {
-  const [file, setFile] = useState(null)
+  const [files, setFiles] = useState([])
   const [uploading, setUploading] = useState(false)
   const [error, setError] = useState(null)
   const dispatch = useDispatch()
@@ -15,24 +15,24 @@ function Onboarding({ onComplete, onGoToDashboard }) {
   }, [dispatch])
 
   const handleFileChange = (e) => {
-    const selectedFile = e.target.files[0]
-    if (selectedFile && selectedFile.type === 'text/csv') {
-      setFile(selectedFile)
+    const selectedFiles = Array.from(e.target.files)
+    if (selectedFiles.length && selectedFiles.every((f) => /\.(csv|parquet|arrows?|feather|ipc|zip)$/i.test(f.name))) {
+      setFiles(selectedFiles)
       setError(null)
     } else {
-      setError('Please select a valid CSV file')
-      setFile(null)
+      setError('Please select CSV, Parquet, Arrow or zip files')
+      setFiles([])
     }
   }
 
   const handleUpload = async () => {
-    if (!file) {
+    if (!files.length) {
       setError('Please select a file first')
       return
     }
 
     const formData = new FormData()
-    formData.append('file', file)
+    files.forEach((f) => formData.append('files', f))
 
     try {
       setUploading(true)
@@ -48,7 +48,25 @@ function Onboarding({ onComplete, onGoToDashboard }) {
         throw new Error(errorData.detail || 'Upload failed')
       }
 
-      const result = await response.json()
+      // The upload is ingested in the background; poll the job until it finishes
+      let result = await response.json()
+      const jobId = result.job_id
+      while (result.status !== 'completed' && result.status !== 'failed') {
+        await new Promise((resolve) => setTimeout(resolve, 500))
+        const jobResponse = await fetch(`http://localhost:8000/api/jobs/${jobId}`)
+        if (!jobResponse.ok) {
+          if (jobResponse.status === 404) {
+            throw new Error('The upload job no longer exists')
+          }
+          const errorData = await jobResponse.json().catch(() => ({}))
+          throw new Error(errorData.detail || `Checking the upload failed (${jobResponse.status})`)
+        }
+        result = await jobResponse.json()
+      }
+
+      if (result.status === 'failed') {
+        throw new Error(result.error || 'Upload failed')
+      }
 
       // Call onComplete to transition to dashboard
       onComplete(result)
@@ -100,7 +118,8 @@ function Onboarding({ onComplete, onGoToDashboard }) {
             <input
               id="fileInput"
               type="file"
-              accept=".csv"
+              accept=".csv,.parquet,.arrow,.arrows,.feather,.ipc,.zip"
+              multiple
               onChange={handleFileChange}
               className="hidden"
             />
@@ -109,19 +128,19 @@ function Onboarding({ onComplete, onGoToDashboard }) {
               htmlFor="fileInput"
               className="cursor-pointer inline-flex items-center px-8 py-4 border border-transparent text-lg font-medium rounded-lg text-white bg-green-600 hover:bg-green-700 transition-colors shadow-lg hover:shadow-xl"
             >
-              Choose CSV File
+              Choose CSV Files
             </label>
 
-            {file && (
+            {files.length > 0 && (
               <div className="mt-6">
                 <p className="text-sm text-gray-600">
-                  Selected: <span className="font-medium text-gray-900">{file.name}</span>
+                  Selected: <span className="font-medium text-gray-900">{files.map((f) => f.name).join(', ')}</span>
                 </p>
               </div>
             )}
           </div>
 
-          {file && (
+          {files.length > 0 && (
             <button
               onClick={handleUpload}
               disabled={uploading}
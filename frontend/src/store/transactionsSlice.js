@@ -30,6 +30,16 @@ export const fetchForecast = createAsyncThunk(
   }
 )
 
+// Summary and forecast in one request; the backend reads the transactions once for both
+export const fetchDashboard = createAsyncThunk(
+  'transactions/fetchDashboard',
+  async () => {
+    const response = await fetch(`${API_URL}/api/dashboard?fields=summary,forecast`)
+    if (!response.ok) throw new Error('Failed to fetch dashboard')
+    return response.json()
+  }
+)
+
 export const checkDataExists = createAsyncThunk(
   'transactions/checkDataExists',
   async (_, { getState }) => {
@@ -105,6 +115,24 @@ const transactionsSlice = createSlice({
         state.error = action.error.message
       })
 
+      .addCase(fetchDashboard.pending, (state) => {
+        state.error = null
+      })
+      .addCase(fetchDashboard.fulfilled, (state, action) => {
+        const { summary, forecast } = action.payload
+        if (summary.error) {
+          state.error = summary.error
+        } else {
+          state.summary = summary
+        }
+        if (!forecast.error) {
+          state.forecast = forecast
+        }
+      })
+      .addCase(fetchDashboard.rejected, (state, action) => {
+        state.error = action.error.message
+      })
+
       .addCase(checkDataExists.fulfilled, (state, action) => {
         state.hasData = action.payload.has_data
       })
@@ -0,0 +1,285 @@
+# Seeded synthetic transaction generator for load testing
+"""
+Generate a realistic, reproducible transaction history of any size.
+
+    python generate_transactions.py --rows 1000000 --output transactions_1m.parquet
+    python generate_transactions.py --rows 10000 --output transactions_10k.csv --seed 7
+
+Times of day follow the per-merchant model in add_timestamps.py (MERCHANT_TIMES).
+The history mixes monthly subscriptions, paychecks and other income, everyday
+spending spread over a long tail of merchants, and injected fraud patterns
+(rapid-fire bursts, duplicate charges, late-night large purchases and
+subscriptions charged twice in a month). Injected rows are labelled in the
+`is_fraud` column, which the upload ignores.
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from add_timestamps import MERCHANT_TIMES, DEFAULT_TIMES
+
+# merchant: (category, monthly amount)
+SUBSCRIPTIONS = {
+    'Rent Payment': ('Housing', 1450.00),
+    'Electric Company': ('Utilities', 150.00),
+    'Water Utility': ('Utilities', 46.00),
+    'Internet Provider': ('Utilities', 79.99),
+    'T-Mobile': ('Utilities', 85.00),
+    'Netflix': ('Entertainment', 15.99),
+    'Spotify': ('Entertainment', 9.99),
+    'Audible': ('Entertainment', 14.95),
+    'Amazon Prime': ('Shopping', 14.99),
+    'Adobe Creative Cloud': ('Business', 52.99),
+    'LinkedIn Premium': ('Business', 29.99),
+    'GitHub Pro': ('Business', 7.00),
+    'Apple iCloud': ('Technology', 2.99),
+    'Planet Fitness': ('Health & Fitness', 29.99),
+    'Blue Apron': ('Food & Dining', 59.94),
+    'Dollar Shave Club': ('Personal Care', 9.00),
+}
+
+# merchant: (category, typical amount)
+EVERYDAY = {
+    'Starbucks': ('Food & Dining', 6.10),
+    'Whole Foods': ('Food & Dining', 96.00),
+    "Trader Joe's": ('Food & Dining', 73.00),
+    'Chipotle': ('Food & Dining', 14.20),
+    'Panera Bread': ('Food & Dining', 13.70),
+    'Subway': ('Food & Dining', 11.00),
+    'Five Guys': ('Food & Dining', 16.75),
+    'Shell Gas Station': ('Transportation', 51.50),
+    'Chevron Gas': ('Transportation', 52.40),
+    'Uber': ('Transportation', 23.00),
+    'Lyft': ('Transportation', 22.85),
+    'Target': ('Shopping', 104.00),
+    'Amazon.com': ('Shopping', 90.00),
+    'Best Buy': ('Electronics', 250.00),
+    'CVS Pharmacy': ('Healthcare', 35.00),
+    'Walgreens': ('Healthcare', 32.40),
+}
+
+TAIL_CATEGORIES = ['Food & Dining', 'Shopping', 'Transportation', 'Entertainment',
+                   'Healthcare', 'Personal Care', 'Electronics', 'Travel']
+
+# Roughly one synthetic subscription service / income stream / tail merchant per this many rows
+ROWS_PER_SUBSCRIPTION = 2000
+ROWS_PER_INCOME_STREAM = 5000
+ROWS_PER_TAIL_MERCHANT = 100
+
+# Month-to-month spread (lognormal sigma) of everyday spending
+MONTHLY_SPEND_SIGMA = 0.15
+
+FRAUD_PATTERNS = ['burst', 'duplicate', 'late_night', 'double_subscription']
+
+
+def slot_seconds(rng, merchants, jitter_minutes=15):
+    """
+    Vectorized get_time_for_merchant: pick one of each merchant's usual times
+    of day and jitter it, returning seconds after midnight
+    """
+    codes, uniques = pd.factorize(merchants)
+    slots, offsets, counts = [], [], []
+    for name in uniques:
+        times = next((t for key, t in MERCHANT_TIMES.items() if name.startswith(key)), DEFAULT_TIMES)
+        offsets.append(len(slots))
+        counts.append(len(times))
+        slots.extend(h * 3600 + m * 60 for h, m in times)
+    offsets, counts, slots = np.array(offsets), np.array(counts), np.array(slots)
+
+    pick = offsets[codes] + (rng.random(len(merchants)) * counts[codes]).astype(int)
+    jitter = rng.integers(-jitter_minutes * 60, jitter_minutes * 60 + 1, len(merchants))
+    return np.clip(slots[pick] + jitter, 0, 86399)
+
+
+def monthly_series(rng, names, categories, amounts, month_starts, day_low, day_high, amount_jitter):
+    """
+    One charge per name per month on a fixed day of month
+    """
+    n, m = len(names), len(month_starts)
+    days = rng.integers(day_low, day_high + 1, n)
+    dates = (month_starts[None, :] + (days[:, None] - 1) * 86400).ravel()
+    scale = 1 + rng.normal(0, amount_jitter, n * m) if amount_jitter else 1
+    return pd.DataFrame({
+        "seconds": dates,
+        "merchant": np.repeat(names, m),
+        "amount": np.repeat(amounts, m) * scale,
+        "category": np.repeat(categories, m),
+    })
+
+
+def made_up_name(i):
+    """
+    Distinct, stable letters-only name for the i-th synthetic merchant, so
+    merchant normalization (which drops long reference numbers) keeps them apart
+    """
+    x = (i * 2654435761 + 12345) % 26 ** 7
+    letters = []
+    for _ in range(7):
+        x, r = divmod(x, 26)
+        letters.append(chr(ord("a") + r))
+    return "".join(letters).capitalize()
+
+
+def generate(rows, seed=42, start="2023-01-01", months=24, fraud_rate=0.002, savings_rate=0.15):
+    """
+    Build a DataFrame of exactly `rows` transactions sorted by date. Paychecks
+    are sized so that income exceeds the generated spending by savings_rate
+    of income over the whole history.
+    """
+    rng = np.random.default_rng(seed)
+    month_starts = (pd.date_range(start, periods=months, freq="MS").to_numpy()
+                    .astype("datetime64[s]").astype(np.int64))
+    span_start, span_end = month_starts[0], month_starts[-1] + 28 * 86400
+
+    # Subscriptions: the known services plus a synthetic long tail
+    extra = max(0, rows // ROWS_PER_SUBSCRIPTION - len(SUBSCRIPTIONS))
+    sub_names = np.array(list(SUBSCRIPTIONS) + [f"{made_up_name(i)} Membership" for i in range(extra)])
+    sub_categories = np.array([c for c, _ in SUBSCRIPTIONS.values()]
+                              + list(rng.choice(TAIL_CATEGORIES, extra)))
+    sub_amounts = np.concatenate([[a for _, a in SUBSCRIPTIONS.values()],
+                                  np.round(rng.lognormal(2.7, 0.6, extra), 2)])
+    subs = monthly_series(rng, sub_names, sub_categories, sub_amounts, month_starts, 1, 28, 0)
+    # Utilities vary month to month
+    variable = subs["category"] == "Utilities"
+    subs.loc[variable, "amount"] *= 1 + rng.normal(0, 0.08, variable.sum())
+    subs["amount"] = -subs["amount"]
+
+    # Fraud events, each expanding to one or more rows
+    events = rng.choice(FRAUD_PATTERNS, max(1, int(rows * fraud_rate) // 2))
+    fraud = inject_fraud(rng, events, subs, span_start, span_end)
+
+    # Income rows: monthly paychecks per stream, plus occasional side income
+    streams = max(1, rows // ROWS_PER_INCOME_STREAM)
+    side_count = max(1, streams * months // 4)
+
+    # Everyday spending fills the remainder over known merchants and a Zipf-weighted tail
+    remaining = rows - len(subs) - streams * months - side_count - len(fraud)
+    if remaining < 0:
+        raise ValueError(f"{rows} rows is too few for {months} months of recurring charges")
+    tail = max(1, rows // ROWS_PER_TAIL_MERCHANT)
+    names = np.array(list(EVERYDAY) + [made_up_name(100_000 + i) for i in range(tail)])
+    categories = np.array([c for c, _ in EVERYDAY.values()] + list(rng.choice(TAIL_CATEGORIES, tail)))
+    typical = np.concatenate([[a for _, a in EVERYDAY.values()], rng.lognormal(3.3, 0.9, tail)])
+    weights = 1.0 / np.arange(1, len(names) + 1) ** 1.1
+    pick = rng.choice(len(names), remaining, p=weights / weights.sum())
+    day_starts = span_start + rng.integers(0, (span_end - span_start) // 86400, remaining) * 86400
+    # Some months are more expensive than others, whatever the number of rows
+    month_factor = rng.lognormal(0, MONTHLY_SPEND_SIGMA, months)[np.searchsorted(month_starts, day_starts, "right") - 1]
+    everyday = pd.DataFrame({
+        "seconds": day_starts,
+        "merchant": names[pick],
+        "amount": -np.round(typical[pick] * month_factor * rng.lognormal(0, 0.35, remaining), 2),
+        "category": categories[pick],
+    })
+
+    side = pd.DataFrame({
+        "seconds": rng.integers(span_start, span_end, side_count),
+        "merchant": rng.choice(["Freelance Project", "Venmo from Sarah", "Venmo from Mike", "Bonus Payment"],
+                               side_count, p=[0.4, 0.25, 0.25, 0.1]),
+        "amount": np.round(rng.lognormal(5.5, 0.8, side_count), 2),
+        "category": "Income",
+    })
+    # Paychecks of differing sizes that together cover spending plus savings
+    spent = -(subs["amount"].sum() + everyday["amount"].sum() + fraud["amount"].sum())
+    paid = max(spent / (1 - savings_rate) - side["amount"].sum(), 0) / months
+    shares = rng.normal(3200, 600, streams).clip(1200)
+    pay_names = np.array(["Paycheck Deposit"] + [f"Paycheck Deposit {i:04d}" for i in range(1, streams)])
+    pay = monthly_series(rng, pay_names, np.full(streams, "Income"),
+                         np.round(paid * shares / shares.sum(), -1), month_starts, 1, 1, 0)
+
+    scheduled = pd.concat([subs, pay, side, everyday], ignore_index=True)
+    scheduled["seconds"] = (scheduled["seconds"] // 86400) * 86400 + slot_seconds(rng, scheduled["merchant"].to_numpy())
+    scheduled["is_fraud"] = False
+
+    df = pd.concat([scheduled, fraud], ignore_index=True).sort_values("seconds", kind="stable")
+    return pd.DataFrame({
+        "date": pd.to_datetime(df["seconds"].to_numpy(), unit="s"),
+        "merchant": df["merchant"].to_numpy(),
+        "amount": np.round(df["amount"].to_numpy(dtype=float), 2),
+        "description": None,
+        "category": df["category"].to_numpy(),
+        "is_fraud": df["is_fraud"].to_numpy(),
+    })
+
+
+def inject_fraud(rng, events, subs, span_start, span_end):
+    parts = []
+    counts = {p: int((events == p).sum()) for p in FRAUD_PATTERNS}
+
+    # Rapid-fire: six charges at an unfamiliar merchant within ten minutes
+    n = counts['burst']
+    if n:
+        base = np.repeat(rng.integers(span_start, span_end, n), 6) + rng.integers(0, 600, n * 6)
+        parts.append(pd.DataFrame({
+            "seconds": base,
+            "merchant": np.repeat([f"{made_up_name(i)} Online" for i in rng.integers(0, 99999, n)], 6),
+            "amount": -np.round(rng.uniform(20, 200, n * 6), 2),
+            "category": "Shopping",
+        }))
+
+    # Duplicate charge: the same everyday merchant and amount twice within minutes
+    n = counts['duplicate']
+    if n:
+        merchants = rng.choice(list(EVERYDAY), n)
+        amounts = -np.array([EVERYDAY[m][1] for m in merchants])
+        first = rng.integers(span_start, span_end, n)
+        parts.append(pd.DataFrame({
+            "seconds": np.concatenate([first, first + rng.integers(20, 240, n)]),
+            "merchant": np.tile(merchants, 2),
+            "amount": np.tile(amounts, 2),
+            "category": np.tile([EVERYDAY[m][0] for m in merchants], 2),
+        }))
+
+    # Large purchase between 2 and 5 AM
+    n = counts['late_night']
+    if n:
+        days = span_start + rng.integers(0, (span_end - span_start) // 86400, n) * 86400
+        parts.append(pd.DataFrame({
+            "seconds": days + rng.integers(2 * 3600, 5 * 3600, n),
+            "merchant": rng.choice(["Best Buy", "Amazon.com", "Gadget Warehouse"], n),
+            "amount": -np.round(rng.uniform(600, 3000, n), 2),
+            "category": "Electronics",
+        }))
+
+    # A subscription charged a second time in the same month
+    n = counts['double_subscription']
+    if n:
+        original = subs.iloc[rng.integers(0, len(subs), n)]
+        parts.append(pd.DataFrame({
+            "seconds": original["seconds"].to_numpy() + rng.integers(1, 3, n) * 86400,
+            "merchant": original["merchant"].to_numpy(),
+            "amount": original["amount"].to_numpy(),
+            "category": original["category"].to_numpy(),
+        }))
+
+    fraud = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+        columns=["seconds", "merchant", "amount", "category"])
+    fraud["is_fraud"] = True
+    return fraud
+
+
+def write(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.assign(date=df["date"].dt.strftime("%Y-%m-%d %H:%M:%S")).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic transactions")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", default="2023-01-01", help="first month of history")
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--fraud-rate", type=float, default=0.002, help="share of rows that are injected fraud")
+    parser.add_argument("--savings-rate", type=float, default=0.15, help="share of income left after spending")
+    parser.add_argument("--output", default="synthetic_transactions.csv", help=".csv or .parquet")
+    args = parser.parse_args()
+
+    df = generate(args.rows, args.seed, args.start, args.months, args.fraud_rate, args.savings_rate)
+    write(df, args.output)
+    print(f"Wrote {len(df)} transactions ({int(df['is_fraud'].sum())} injected fraud) "
+          f"across {df['merchant'].nunique()} merchants to {args.output}")
+
+
+if __name__ == "__main__":
+    main()